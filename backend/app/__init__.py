@@ -1,22 +1,47 @@
 # backend/app/__init__.py
 from flask import Flask
+from flask_caching import Cache
 from flask_cors import CORS
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from urllib.parse import quote
+import atexit
 import logging
 import os
+import queue
 
-def create_app(config_name='default'):
-    """Application factory"""
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s %(message)s'
+
+# QueueListener dùng chung cho cả process
+_log_listener = None
+
+cache = Cache()
+
+# Các thư mục đã được tạo trong process này
+_created_directories = set()
+
+def create_app(config_name='default', config_overrides=None):
+    """
+    Application factory
+    
+    Args:
+        config_name: Tên cấu hình trong app.config.config
+        config_overrides: Dict ghi đè các giá trị cấu hình (tùy chọn)
+    """
     app = Flask(__name__)
     
     # Load configuration
     from .config import config
     app.config.from_object(config[config_name])
+    if config_overrides:
+        app.config.update(config_overrides)
     
     # Setup logging
     setup_logging(app)
     
     # Initialize extensions
     CORS(app, origins=app.config['CORS_ORIGINS'])
+    cache.init_app(app)
     
     # Initialize database
     from .models import init_db
@@ -25,6 +50,21 @@ def create_app(config_name='default'):
     # Create directories
     create_directories(app)
     
+    # Worker pool xử lý cuộc họp trong background (dùng chung app, không tạo lại)
+    app.extensions['executor'] = ThreadPoolExecutor(
+        max_workers=app.config['PROCESSING_WORKERS'],
+        thread_name_prefix='meeting-processing'
+    )
+    
+    # Redis queue cho worker process riêng (worker.py)
+    if app.config['REDIS_URL']:
+        from redis import Redis
+        from rq import Queue
+        app.extensions['processing_queue'] = Queue(
+            app.config['PROCESSING_QUEUE'],
+            connection=Redis.from_url(app.config['REDIS_URL'])
+        )
+    
     # Register routes
     from .routes import register_routes
     register_routes(app)
@@ -36,29 +76,63 @@ def create_app(config_name='default'):
     # Error handlers
     register_error_handlers(app)
     
+    # X-Accel-Redirect cho nginx
+    register_sendfile_offload(app)
+    
     return app
 
 def setup_logging(app):
-    """Setup logging configuration"""
-    if not app.debug:
-        # Production logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s %(levelname)s %(name)s %(message)s',
-            handlers=[
-                logging.FileHandler('app.log'),
-                logging.StreamHandler()
-            ]
-        )
-    else:
-        # Development logging
-        logging.basicConfig(
-            level=logging.DEBUG,
-            format='%(asctime)s %(levelname)s %(name)s %(message)s'
-        )
+    """
+    Setup logging configuration
+    
+    Root logger chỉ đẩy record vào queue; việc ghi file/console được thực hiện
+    bởi một QueueListener thread riêng để không chặn request và worker threads.
+    """
+    global _log_listener
+    
+    if _log_listener is None:
+        formatter = logging.Formatter(LOG_FORMAT)
+        
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+        handlers = [stream_handler]
+        
+        if not app.debug:
+            # Production logging
+            file_handler = logging.FileHandler('app.log')
+            file_handler.setFormatter(formatter)
+            handlers.append(file_handler)
+        
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        root.setLevel(logging.DEBUG if app.debug else logging.INFO)
+        root.addHandler(QueueHandler(log_queue))
+        
+        _log_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _log_listener.start()
+        atexit.register(_stop_log_listener)
+        
+        # Thread không tồn tại sau fork, process con cần listener riêng
+        os.register_at_fork(after_in_child=_restart_log_listener)
+
+def _restart_log_listener():
+    """Tạo listener mới (cùng queue và handlers) trong process con sau khi fork"""
+    global _log_listener
+    _log_listener = QueueListener(
+        _log_listener.queue,
+        *_log_listener.handlers,
+        respect_handler_level=True
+    )
+    _log_listener.start()
+
+def _stop_log_listener():
+    """Dừng listener sau khi ghi hết các record còn trong queue"""
+    _log_listener.stop()
+    for handler in _log_listener.handlers:
+        handler.close()
 
 def create_directories(app):
-    """Tạo các thư mục cần thiết"""
+    """Tạo các thư mục cần thiết (mỗi thư mục chỉ tạo một lần trong process)"""
     directories = [
         app.config['UPLOAD_FOLDER'],
         app.config['OUTPUT_FOLDER'],
@@ -66,7 +140,31 @@ def create_directories(app):
     ]
     
     for directory in directories:
-        os.makedirs(directory, exist_ok=True)
+        if directory not in _created_directories:
+            os.makedirs(directory, exist_ok=True)
+            _created_directories.add(directory)
+
+def register_sendfile_offload(app):
+    """
+    Chuyển header X-Sendfile (do send_file tạo khi USE_X_SENDFILE bật) thành
+    X-Accel-Redirect để nginx gửi file trong OUTPUT_FOLDER bằng sendfile(2)
+    """
+    prefix = app.config.get('X_ACCEL_REDIRECT_PREFIX')
+    if not app.config['USE_X_SENDFILE'] or not prefix:
+        return
+    
+    prefix = prefix.rstrip('/')
+    output_folder = os.path.abspath(app.config['OUTPUT_FOLDER'])
+    
+    @app.after_request
+    def x_accel_redirect(response):
+        file_path = response.headers.get('X-Sendfile')
+        if file_path:
+            relative_path = os.path.relpath(file_path, output_folder)
+            if not relative_path.startswith(os.pardir):
+                del response.headers['X-Sendfile']
+                response.headers['X-Accel-Redirect'] = f"{prefix}/{quote(relative_path.replace(os.sep, '/'))}"
+        return response
 
 def register_error_handlers(app):
     """Đăng ký error handlers"""
@@ -23,15 +23,54 @@ class Config:
     OUTPUT_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'outputs')
     TEMP_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'temp')
     
+    # File download: khi chạy sau nginx, X-Sendfile được chuyển thành
+    # X-Accel-Redirect với prefix này (location internal trỏ tới OUTPUT_FOLDER)
+    X_ACCEL_REDIRECT_PREFIX = os.environ.get('X_ACCEL_REDIRECT_PREFIX')
+    # Thời gian browser/CDN được cache file tải về (seconds), sau đó revalidate bằng ETag/Last-Modified
+    DOWNLOAD_MAX_AGE = 3600
+    
     # Allowed file extensions
     ALLOWED_EXTENSIONS = {
-        'video': {'mp4', 'avi', 'mov', 'mkv', 'webm', 'flv', 'wmv'},
-        'audio': {'mp3', 'wav', 'flac', 'aac', 'm4a', 'ogg', 'wma'}
+        'video': frozenset({'mp4', 'avi', 'mov', 'mkv', 'webm', 'flv', 'wmv'}),
+        'audio': frozenset({'mp3', 'wav', 'flac', 'aac', 'm4a', 'ogg', 'wma'})
     }
     
     # AI Services
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
+    # Số request OpenAI tối đa chạy cùng lúc trong một process
+    LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY') or 4)
+    # Thời gian cache kết quả LLM cho cùng một request (seconds), 0 = tắt cache
+    LLM_CACHE_TTL = int(os.environ.get('LLM_CACHE_TTL') or 7 * 24 * 3600)
+    # Gửi phân tích LLM qua OpenAI Batch API (rẻ hơn 50%, kết quả có thể mất tới 24h),
+    # kết quả được cập nhật bởi batch_poller.py
+    LLM_BATCH_MODE = os.environ.get('LLM_BATCH_MODE', '').lower() in ('1', 'true', 'yes')
+    LLM_BATCH_POLL_INTERVAL = int(os.environ.get('LLM_BATCH_POLL_INTERVAL') or 60)  # seconds
     WHISPER_MODEL = os.environ.get('WHISPER_MODEL') or 'base'
+    # Kiểu số của faster-whisper (int8, int8_float16, float16...), mặc định theo device
+    WHISPER_COMPUTE_TYPE = os.environ.get('WHISPER_COMPUTE_TYPE')
+    # Số đoạn audio (~30s) của một file được decode cùng lúc trên model
+    # (BatchedInferencePipeline), 1 = decode tuần tự
+    WHISPER_BATCH_SIZE = int(os.environ.get('WHISPER_BATCH_SIZE') or 8)
+    # Load Whisper model ngay khi khởi động app (khi không dùng Redis queue).
+    # Các process không transcription (batch_poller.py) tắt để không load model.
+    WHISPER_PRELOAD = True
+    
+    # Background processing
+    PROCESSING_WORKERS = int(os.environ.get('PROCESSING_WORKERS') or 2)
+    
+    # Khi có REDIS_URL, job xử lý được đẩy vào Redis queue cho worker.py
+    # (process riêng, có thể chạy trên GPU) thay vì chạy trong web process
+    REDIS_URL = os.environ.get('REDIS_URL')
+    PROCESSING_QUEUE = os.environ.get('PROCESSING_QUEUE') or 'meeting-processing'
+    PROCESSING_JOB_TIMEOUT = 4 * 3600  # seconds
+    # Cuộc họp ở 'processing' quá thời gian này không có cập nhật được coi là
+    # job đã mất (process khởi động lại...) và có thể xử lý lại
+    PROCESSING_STALE_TIMEOUT = int(os.environ.get('PROCESSING_STALE_TIMEOUT') or PROCESSING_JOB_TIMEOUT)
+    
+    # Cache cho các endpoint được poll liên tục (stats, tiến độ xử lý)
+    CACHE_TYPE = os.environ.get('CACHE_TYPE') or 'SimpleCache'
+    CACHE_DEFAULT_TIMEOUT = 2
+    CACHE_REDIS_URL = os.environ.get('REDIS_URL')
     
     # CORS
     CORS_ORIGINS = ['http://localhost:3000', 'http://127.0.0.1:3000']
@@ -40,7 +79,12 @@ class Config:
     LOG_LEVEL = 'DEBUG'
 
 class DevelopmentConfig(Config):
-    """Development configuration"""
+    """
+    Development configuration
+    
+    Chỉ dùng với Flask development server (run.py). Khi deploy production,
+    chạy wsgi.py bằng gunicorn với ProductionConfig.
+    """
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('DEV_DATABASE_URL') or \
         'sqlite:///' + os.path.join(os.path.dirname(os.path.dirname(__file__)), 'dev_meetings.db')
@@ -54,6 +98,10 @@ class TestingConfig(Config):
 class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
+    # Để web server (nginx/Apache) gửi file bằng sendfile thay vì Python
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+    # Dùng Redis để cache được chia sẻ giữa các worker process
+    CACHE_TYPE = os.environ.get('CACHE_TYPE') or ('RedisCache' if os.environ.get('REDIS_URL') else 'SimpleCache')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(os.path.dirname(os.path.dirname(__file__)), 'meetings.db')
 
@@ -1,10 +1,40 @@
 # backend/app/models/__init__.py
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Engine
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
 
 db = SQLAlchemy()
 
+@event.listens_for(Engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Bật WAL cho SQLite để request đọc không bị chặn khi worker đang ghi"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+def _engine_options(app):
+    """Điều chỉnh engine options theo loại database"""
+    engine_options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        # SQLite là file local, không cần SELECT 1 mỗi lần checkout connection
+        engine_options.pop('pool_pre_ping', None)
+        # Connection được dùng từ cả request threads và worker threads
+        connect_args = dict(engine_options.get('connect_args', {}))
+        connect_args['check_same_thread'] = False
+        engine_options['connect_args'] = connect_args
+    
+    return engine_options
+
 def init_db(app):
     """Initialize database"""
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = _engine_options(app)
     db.init_app(app)
     
     # Import models để SQLAlchemy biết về chúng
@@ -13,3 +43,41 @@ def init_db(app):
     # Tạo tables nếu chưa tồn tại
     with app.app_context():
         db.create_all()
+        _upgrade_existing_tables()
+
+def _upgrade_existing_tables():
+    """
+    Thêm các cột và index mới vào bảng đã có
+    
+    db.create_all() không thay đổi bảng đã tồn tại, nên database tạo từ phiên
+    bản cũ sẽ thiếu các cột mới. Chỉ hỗ trợ thêm cột nullable (ALTER TABLE ADD
+    COLUMN); chạy nhiều lần không có tác dụng gì thêm.
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    
+    for table in db.metadata.sorted_tables:
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            
+            if not column.nullable:
+                logger.error(f"Cannot add NOT NULL column {table.name}.{column.name} automatically, migrate the database manually")
+                continue
+            
+            column_type = column.type.compile(dialect=engine.dialect)
+            try:
+                with engine.begin() as connection:
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                logger.info(f"Added column {table.name}.{column.name}")
+            except Exception as e:
+                # Process khác (worker khởi động cùng lúc) có thể đã thêm cột này
+                logger.warning(f"Could not add column {table.name}.{column.name}: {str(e)}")
+        
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except Exception as e:
+                logger.warning(f"Could not create index {index.name}: {str(e)}")
@@ -1,10 +1,15 @@
 # backend/app/models/meeting.py
 from . import db
-from datetime import datetime
-import json
+from sqlalchemy import func
+from types import SimpleNamespace
+import orjson
 
 class Meeting(db.Model):
     __tablename__ = 'meetings'
+    __table_args__ = (
+        # Lọc theo status và sắp xếp theo created_at cho danh sách cuộc họp
+        db.Index('ix_meetings_status_created', 'status', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -23,14 +28,19 @@ class Meeting(db.Model):
     status = db.Column(db.String(50), default='uploaded')  # uploaded, processing, completed, failed
     processing_progress = db.Column(db.Integer, default=0)  # 0-100
     error_message = db.Column(db.Text)
+    llm_batch_id = db.Column(db.String(100), index=True)  # OpenAI batch đang chờ kết quả
     
     # Timestamps
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Timestamp do database điền (CURRENT_TIMESTAMP), không tạo datetime trong Python.
+    # default đưa now() vào câu INSERT, vì bảng tạo từ phiên bản cũ không có DEFAULT
+    # cho các cột này (server_default chỉ có tác dụng với bảng mới).
+    created_at = db.Column(db.DateTime, default=func.now(), server_default=func.now(), index=True)
+    updated_at = db.Column(db.DateTime, default=func.now(), server_default=func.now(), onupdate=func.now())
     processed_at = db.Column(db.DateTime)
     
     # Output files
     document_path = db.Column(db.String(500))
+    download_name = db.Column(db.String(255))  # Tên file khi tải tài liệu về
     audio_path = db.Column(db.String(500))
     
     def to_dict(self):
@@ -42,8 +52,8 @@ class Meeting(db.Model):
             'duration': self.duration,
             'transcript': self.transcript,
             'summary': self.summary,
-            'action_items': json.loads(self.action_items) if self.action_items else [],
-            'participants': json.loads(self.participants) if self.participants else [],
+            'action_items': self._load_json_list('action_items'),
+            'participants': self._load_json_list('participants'),
             'status': self.status,
             'processing_progress': self.processing_progress,
             'error_message': self.error_message,
@@ -53,8 +63,49 @@ class Meeting(db.Model):
             'document_path': self.document_path
         }
     
+    def to_view(self):
+        """
+        View nhẹ của cuộc họp cho việc tạo tài liệu
+        
+        Khác với to_dict, không chuyển datetime sang ISO string và dùng lại
+        các list JSON đã được parse.
+        """
+        return SimpleNamespace(
+            id=self.id,
+            title=self.title,
+            filename=self.filename,
+            duration=self.duration,
+            transcript=self.transcript,
+            summary=self.summary,
+            action_items=self._load_json_list('action_items'),
+            participants=self._load_json_list('participants'),
+            created_at=self.created_at
+        )
+    
+    def _load_json_list(self, field):
+        """
+        Parse cột JSON, dùng lại kết quả đã parse nếu chuỗi JSON chưa thay đổi
+        
+        Cache lưu cặp (chuỗi JSON, list đã parse) trong __dict__ của instance,
+        nên khi cột được load lại từ database thì cache tự động bị bỏ qua.
+        """
+        raw = getattr(self, field)
+        cache_key = f'_{field}_cache'
+        cached = self.__dict__.get(cache_key)
+        if cached is not None and cached[0] is raw:
+            return cached[1]
+        
+        value = orjson.loads(raw) if raw else []
+        self.__dict__[cache_key] = (raw, value)
+        return value
+    
+    def _store_json_list(self, field, items):
+        raw = orjson.dumps(items).decode()
+        setattr(self, field, raw)
+        self.__dict__[f'_{field}_cache'] = (raw, items)
+    
     def set_action_items(self, items):
-        self.action_items = json.dumps(items, ensure_ascii=False)
+        self._store_json_list('action_items', items)
     
     def set_participants(self, participants):
-        self.participants = json.dumps(participants, ensure_ascii=False)
+        self._store_json_list('participants', participants)
@@ -58,7 +58,14 @@ def download_file(filename):
                 'error': 'File không tồn tại'
             }), 404
         
-        return send_file(file_path, as_attachment=True)
+        return send_file(
+            file_path,
+            as_attachment=True,
+            conditional=True,
+            etag=True,
+            last_modified=os.path.getmtime(file_path),
+            max_age=current_app.config['DOWNLOAD_MAX_AGE']
+        )
         
     except Exception as e:
         logger.error(f"Error downloading file: {str(e)}")
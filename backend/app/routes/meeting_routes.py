@@ -1,16 +1,25 @@
 # backend/app/routes/meeting_routes.py
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, abort, stream_with_context
 from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
+from sqlalchemy import select, func, update, case, and_, or_
+from datetime import datetime, timedelta, timezone
+import json
+import math
 import os
+import re
 import logging
 import threading
-from datetime import datetime
+import time
 
+from .. import cache
+from ..config import Config
 from ..models import db
 from ..models.meeting import Meeting
 from ..services.audio_processor import AudioProcessor
 from ..services.transcription_service import TranscriptionService
-from ..services.llm_service import LLMService
+from ..services.llm_service import LLMService, MEETING_TASKS
+from ..services.llm_cache import LLMCache
 from ..services.document_generator import DocumentGenerator
 from ..utils.file_handler import FileHandler
 from ..utils.validators import Validators
@@ -26,13 +35,183 @@ llm_service = None
 document_generator = None
 file_handler = None
 
+# Các cột cần cho màn hình danh sách (bỏ transcript, summary và các cột JSON)
+LIST_COLUMNS = (
+    Meeting.id,
+    Meeting.title,
+    Meeting.filename,
+    Meeting.file_size,
+    Meeting.duration,
+    Meeting.status,
+    Meeting.processing_progress,
+    Meeting.error_message,
+    Meeting.created_at,
+    Meeting.updated_at,
+    Meeting.processed_at,
+    Meeting.document_path
+)
+
+LIST_DATETIME_FIELDS = ('created_at', 'updated_at', 'processed_at')
+
+# Nhận diện file video theo extension (tạo một lần khi import module)
+_is_video = re.compile(
+    r'\.(%s)$' % '|'.join(sorted(Config.ALLOWED_EXTENSIONS['video'])),
+    re.IGNORECASE
+).search
+
+# Khoảng thời gian tối thiểu (giây) giữa hai lần commit tiến độ không quan trọng
+PROGRESS_COMMIT_INTERVAL = 2.0
+
+# Thời điểm commit gần nhất, riêng cho từng worker thread
+_progress_state = threading.local()
+
+def _get_meeting_or_404(meeting_id):
+    """Lấy cuộc họp theo primary key (qua identity map), abort 404 nếu không có"""
+    meeting = db.session.get(Meeting, meeting_id)
+    if meeting is None:
+        abort(404)
+    return meeting
+
+def _count_status(status):
+    """Biểu thức SQL đếm số cuộc họp có status cho trước"""
+    return func.coalesce(func.sum(case((Meeting.status == status, 1), else_=0)), 0)
+
+def _list_row_to_dict(row):
+    """Chuyển một row của LIST_COLUMNS thành dict"""
+    item = row._asdict()
+    for field in LIST_DATETIME_FIELDS:
+        if item[field] is not None:
+            item[field] = item[field].isoformat()
+    return item
+
+# Thời gian cache (giây) cho endpoint thống kê
+STATS_CACHE_TIMEOUT = 5
+
+# Các status cho phép bắt đầu (lại) việc xử lý
+CLAIMABLE_STATUSES = ('uploaded', 'failed')
+
+def _claim_for_processing(meeting_id):
+    """
+    Chuyển cuộc họp sang status 'processing' bằng một câu UPDATE có điều kiện
+    
+    Cuộc họp kẹt ở 'processing' (job bị mất khi process khởi động lại...) quá
+    PROCESSING_STALE_TIMEOUT giây không có cập nhật cũng được claim lại. Cuộc
+    họp đang chờ OpenAI batch thuộc về batch_poller.py nên không bị claim lại.
+    
+    Returns:
+        True nếu request này giành được quyền xử lý cuộc họp
+    """
+    stale_before = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(
+        seconds=current_app.config['PROCESSING_STALE_TIMEOUT']
+    )
+    result = db.session.execute(
+        update(Meeting)
+        .where(
+            Meeting.id == meeting_id,
+            or_(
+                Meeting.status.in_(CLAIMABLE_STATUSES),
+                and_(
+                    Meeting.status == 'processing',
+                    Meeting.llm_batch_id.is_(None),
+                    Meeting.updated_at < stale_before
+                )
+            )
+        )
+        .values(status='processing', processing_progress=0, error_message=None)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+def _claim_for_regeneration(meeting_id):
+    """
+    Chuyển cuộc họp đã hoàn thành (không chờ OpenAI batch) sang 'processing'
+    trong lúc tạo lại tóm tắt, bằng một câu UPDATE có điều kiện
+    
+    Returns:
+        True nếu request này giành được quyền tạo lại tóm tắt
+    """
+    result = db.session.execute(
+        update(Meeting)
+        .where(
+            Meeting.id == meeting_id,
+            Meeting.status == 'completed',
+            Meeting.llm_batch_id.is_(None)
+        )
+        .values(status='processing')
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+def _release_regeneration(meeting_id):
+    """Trả cuộc họp về 'completed' sau khi tạo lại tóm tắt (không làm gì nếu đã trả)"""
+    db.session.rollback()
+    db.session.execute(
+        update(Meeting)
+        .where(Meeting.id == meeting_id, Meeting.status == 'processing')
+        .values(status='completed')
+    )
+    db.session.commit()
+
+def _submit_processing(meeting_id):
+    """
+    Đưa cuộc họp đã được claim vào hàng đợi xử lý
+    
+    Nếu có Redis queue, job được chạy bởi worker process riêng (worker.py);
+    nếu không, job chạy trong worker pool của web process. Nếu không đưa được
+    vào hàng đợi, cuộc họp được chuyển sang 'failed' để có thể xử lý lại.
+    
+    Returns:
+        ID của job trong Redis queue (None khi chạy trong web process)
+    """
+    app = current_app._get_current_object()
+    processing_queue = app.extensions.get('processing_queue')
+    
+    try:
+        if processing_queue is not None:
+            job = processing_queue.enqueue(
+                run_processing_job,
+                meeting_id,
+                job_timeout=app.config['PROCESSING_JOB_TIMEOUT']
+            )
+            return job.id
+        
+        app.extensions['executor'].submit(process_meeting_async, app, meeting_id)
+        return None
+    
+    except Exception as e:
+        logger.error(f"Error submitting meeting {meeting_id} for processing: {str(e)}")
+        db.session.rollback()
+        db.session.execute(
+            update(Meeting)
+            .where(Meeting.id == meeting_id)
+            .values(status='failed', error_message='Không thể đưa cuộc họp vào hàng đợi xử lý')
+        )
+        db.session.commit()
+        raise
+
+def run_processing_job(meeting_id):
+    """Entry point của job trong Redis queue, chạy trong app context của worker.py"""
+    process_meeting_async(current_app._get_current_object(), meeting_id)
+
 def init_services(app):
     """Khởi tạo các services"""
     global audio_processor, transcription_service, llm_service, document_generator, file_handler
     
     audio_processor = AudioProcessor(app.config['TEMP_FOLDER'])
-    transcription_service = TranscriptionService(app.config['WHISPER_MODEL'])
-    llm_service = LLMService(app.config['OPENAI_API_KEY'])
+    # Khi xử lý bằng worker process riêng, web process không cần load Whisper model;
+    # worker.py chạy lần lượt từng job nên chỉ cần một worker của model
+    transcription_service = TranscriptionService(
+        app.config['WHISPER_MODEL'],
+        preload=app.config['WHISPER_PRELOAD'] and not app.config['REDIS_URL'],
+        num_workers=1 if app.config['REDIS_URL'] else app.config['PROCESSING_WORKERS'],
+        compute_type=app.config['WHISPER_COMPUTE_TYPE'],
+        batch_size=app.config['WHISPER_BATCH_SIZE']
+    )
+    llm_cache = None
+    if app.config['LLM_CACHE_TTL'] > 0:
+        # Dùng chung Redis với processing queue nếu có, nếu không cache trong process
+        llm_cache = LLMCache(app.config['REDIS_URL'], ttl=app.config['LLM_CACHE_TTL'])
+    llm_service = LLMService(app.config['OPENAI_API_KEY'], app.config['LLM_MAX_CONCURRENCY'], llm_cache)
     document_generator = DocumentGenerator(app.config['OUTPUT_FOLDER'])
     file_handler = FileHandler(app.config['UPLOAD_FOLDER'], app.config['ALLOWED_EXTENSIONS'])
 
@@ -44,31 +223,45 @@ def get_meetings():
         per_page = request.args.get('per_page', 10, type=int)
         status = request.args.get('status')
         
-        # Query với pagination
-        query = Meeting.query
+        if page < 1:
+            page = 1
+        if per_page < 1:
+            per_page = 10
+        
+        # Query trực tiếp các cột cần thiết, không tạo ORM object
+        list_query = select(*LIST_COLUMNS)
+        count_query = select(func.count(Meeting.id))
         
         if status:
-            query = query.filter(Meeting.status == status)
+            list_query = list_query.where(Meeting.status == status)
+            count_query = count_query.where(Meeting.status == status)
         
-        meetings = query.order_by(Meeting.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        with db.session.no_autoflush:
+            total = db.session.execute(count_query).scalar()
+            rows = db.session.execute(
+                list_query
+                .order_by(Meeting.created_at.desc())
+                .limit(per_page)
+                .offset((page - 1) * per_page)
+            ).all()
+        
+        pages = math.ceil(total / per_page)
         
         return jsonify({
             'success': True,
             'data': {
-                'meetings': [meeting.to_dict() for meeting in meetings.items],
+                'meetings': [_list_row_to_dict(row) for row in rows],
                 'pagination': {
                     'page': page,
                     'per_page': per_page,
-                    'total': meetings.total,
-                    'pages': meetings.pages,
-                    'has_next': meetings.has_next,
-                    'has_prev': meetings.has_prev
+                    'total': total,
+                    'pages': pages,
+                    'has_next': page < pages,
+                    'has_prev': page > 1
                 }
             }
         })
-        
+    
     except Exception as e:
         logger.error(f"Error getting meetings: {str(e)}")
         return jsonify({
@@ -80,12 +273,20 @@ def get_meetings():
 def get_meeting(meeting_id):
     """Lấy thông tin chi tiết cuộc họp"""
     try:
-        meeting = Meeting.query.get_or_404(meeting_id)
-        return jsonify({
+        meeting = _get_meeting_or_404(meeting_id)
+        
+        response = jsonify({
             'success': True,
             'data': meeting.to_dict()
         })
         
+        # ETag là hash của nội dung trả về, nên đổi theo mọi thay đổi của cuộc họp
+        # (updated_at chỉ chính xác tới giây). Client poll tiến độ nhận 304 nếu
+        # cuộc họp chưa thay đổi.
+        response.add_etag()
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    
     except Exception as e:
         logger.error(f"Error getting meeting {meeting_id}: {str(e)}")
         return jsonify({
@@ -107,103 +308,155 @@ def upload_meeting():
         file = request.files['file']
         title = request.form.get('title', '').strip()
         
-        # Validate file
-        validation_result = Validators.validate_file_upload(
-            file, 
-            current_app.config['ALLOWED_EXTENSIONS'],
-            current_app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+        return _create_meeting_from_upload(file, title, file_handler.save_uploaded_file)
+    
+    except RequestEntityTooLarge:
+        return jsonify({
+            'success': False,
+            'error': 'File quá lớn'
+        }), 413
+    
+    except Exception as e:
+        logger.error(f"Error uploading meeting: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Lỗi khi upload file'
+        }), 500
+
+@meeting_bp.route('/upload-stream', methods=['POST'])
+def upload_meeting_stream():
+    """
+    Upload file cuộc họp dạng stream
+    
+    Phần file của multipart body được ghi thẳng vào thư mục upload trong lúc
+    nhận request, sau đó chỉ cần đổi tên thay vì copy lại từ file tạm.
+    """
+    temp_files = []
+    
+    def stream_factory(*args, **kwargs):
+        stream = file_handler.open_upload_stream(*args, **kwargs)
+        temp_files.append(stream.name)
+        return stream
+    
+    try:
+        _, form, files = parse_form_data(
+            request.environ,
+            stream_factory=stream_factory,
+            max_content_length=current_app.config['MAX_CONTENT_LENGTH']
         )
         
-        if not validation_result['valid']:
+        if 'file' not in files:
             return jsonify({
                 'success': False,
-                'error': validation_result['errors'][0] if validation_result['errors'] else 'File không hợp lệ'
+                'error': 'Không có file được upload'
             }), 400
         
-        # Tạo title mặc định nếu không có
-        if not title:
-            title = os.path.splitext(file.filename)[0]
-        
-        # Lưu file
-        file_info = file_handler.save_uploaded_file(file)
-        if not file_info:
-            return jsonify({
-                'success': False,
-                'error': 'Lỗi khi lưu file'
-            }), 500
-        
-        # Lấy thông tin media
-        media_info = audio_processor.get_media_info(file_info['file_path'])
-        
-        # Tạo record trong database
-        meeting = Meeting(
-            title=title,
-            filename=file_info['filename'],
-            file_path=file_info['file_path'],
-            file_size=file_info['size'],
-            duration=media_info.get('duration') if media_info else None,
-            status='uploaded'
-        )
-        
-        db.session.add(meeting)
-        db.session.commit()
-        
-        # Bắt đầu xử lý trong background
-        threading.Thread(
-            target=process_meeting_async,
-            args=(meeting.id,),
-            daemon=True
-        ).start()
-        
-        return jsonify({
-            'success': True,
-            'data': meeting.to_dict(),
-            'message': 'File đã được upload thành công. Đang bắt đầu xử lý...'
-        }), 201
+        file = files['file']
+        title = form.get('title', '').strip()
         
+        return _create_meeting_from_upload(file, title, file_handler.save_streamed_file)
+    
     except RequestEntityTooLarge:
         return jsonify({
             'success': False,
             'error': 'File quá lớn'
         }), 413
-        
+    
     except Exception as e:
         logger.error(f"Error uploading meeting: {str(e)}")
         return jsonify({
             'success': False,
             'error': 'Lỗi khi upload file'
         }), 500
+    
+    finally:
+        # Xóa các file tạm không được dùng (file lỗi, field thừa...)
+        for temp_path in temp_files:
+            if os.path.exists(temp_path):
+                file_handler.delete_file(temp_path)
+
+def _create_meeting_from_upload(file, title, save_file):
+    """Validate, lưu file upload, tạo record cuộc họp và bắt đầu xử lý"""
+    # Validate file
+    validation_result = Validators.validate_file_upload(
+        file, 
+        current_app.config['ALLOWED_EXTENSIONS'],
+        current_app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    )
+    
+    if not validation_result['valid']:
+        return jsonify({
+            'success': False,
+            'error': validation_result['errors'][0] if validation_result['errors'] else 'File không hợp lệ'
+        }), 400
+    
+    # Tạo title mặc định nếu không có
+    if not title:
+        title = os.path.splitext(file.filename)[0]
+    
+    # Lưu file
+    file_info = save_file(file)
+    if not file_info:
+        return jsonify({
+            'success': False,
+            'error': 'Lỗi khi lưu file'
+        }), 500
+    
+    # Lấy thông tin media
+    media_info = audio_processor.get_media_info(file_info['file_path'])
+    
+    # Tạo record trong database
+    meeting = Meeting(
+        title=title,
+        filename=file_info['filename'],
+        file_path=file_info['file_path'],
+        file_size=file_info['size'],
+        duration=media_info.get('duration') if media_info else None,
+        status='uploaded'
+    )
+    
+    db.session.add(meeting)
+    db.session.commit()
+    
+    # Bắt đầu xử lý trong background, claim giống như POST /<id>/process
+    _claim_for_processing(meeting.id)
+    job_id = _submit_processing(meeting.id)
+    
+    return jsonify({
+        'success': True,
+        'data': meeting.to_dict(),
+        'job_id': job_id,
+        'message': 'File đã được upload thành công. Đang bắt đầu xử lý...'
+    }), 201
 
 @meeting_bp.route('/<int:meeting_id>/process', methods=['POST'])
 def process_meeting(meeting_id):
     """Xử lý cuộc họp (transcription + LLM analysis)"""
     try:
-        meeting = Meeting.query.get_or_404(meeting_id)
-        
-        if meeting.status == 'processing':
+        if not _claim_for_processing(meeting_id):
+            meeting = _get_meeting_or_404(meeting_id)
+            
+            if meeting.status == 'completed':
+                return jsonify({
+                    'success': False,
+                    'error': 'Cuộc họp đã được xử lý'
+                }), 400
+            
             return jsonify({
                 'success': False,
                 'error': 'Cuộc họp đang được xử lý'
             }), 400
         
-        if meeting.status == 'completed':
-            return jsonify({
-                'success': False,
-                'error': 'Cuộc họp đã được xử lý'
-            }), 400
-        
         # Bắt đầu xử lý trong background
-        threading.Thread(
-            target=process_meeting_async,
-            args=(meeting_id,),
-            daemon=True
-        ).start()
+        job_id = _submit_processing(meeting_id)
         
+        # Việc xử lý chạy nền, client theo dõi qua GET /<meeting_id> hoặc GET /jobs/<job_id>
         return jsonify({
             'success': True,
+            'job_id': job_id,
             'message': 'Bắt đầu xử lý cuộc họp'
-        })
-        
+        }), 202
+    
     except Exception as e:
         logger.error(f"Error starting meeting processing: {str(e)}")
         return jsonify({
@@ -211,26 +464,60 @@ def process_meeting(meeting_id):
             'error': 'Lỗi khi bắt đầu xử lý'
         }), 500
 
+@meeting_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_processing_job(job_id):
+    """Lấy trạng thái job xử lý trong Redis queue"""
+    processing_queue = current_app.extensions.get('processing_queue')
+    job = processing_queue.fetch_job(job_id) if processing_queue is not None else None
+    if job is None:
+        abort(404)
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'id': job.id,
+            'meeting_id': job.args[0] if job.args else None,
+            # queued, started, finished, failed...
+            'status': job.get_status(),
+            'enqueued_at': job.enqueued_at.isoformat() if job.enqueued_at else None,
+            'started_at': job.started_at.isoformat() if job.started_at else None,
+            'ended_at': job.ended_at.isoformat() if job.ended_at else None
+        }
+    })
+
 @meeting_bp.route('/<int:meeting_id>/download', methods=['GET'])
 def download_meeting_document(meeting_id):
     """Download tài liệu cuộc họp"""
     try:
         from flask import send_file
         
-        meeting = Meeting.query.get_or_404(meeting_id)
+        # Chỉ cần đường dẫn và tên file tải về, không load cả object
+        row = db.session.execute(
+            select(Meeting.document_path, Meeting.download_name)
+            .where(Meeting.id == meeting_id)
+        ).one_or_none()
+        
+        if row is None:
+            abort(404)
         
-        if not meeting.document_path or not os.path.exists(meeting.document_path):
+        document_path, download_name = row
+        
+        if not document_path or not os.path.exists(document_path):
             return jsonify({
                 'success': False,
                 'error': 'Tài liệu chưa được tạo'
             }), 404
         
         return send_file(
-            meeting.document_path,
+            document_path,
             as_attachment=True,
-            download_name=f"bien_ban_{meeting.title}_{meeting.id}.docx"
+            download_name=download_name or os.path.basename(document_path),
+            conditional=True,
+            etag=True,
+            last_modified=os.path.getmtime(document_path),
+            max_age=current_app.config['DOWNLOAD_MAX_AGE']
         )
-        
+    
     except Exception as e:
         logger.error(f"Error downloading document: {str(e)}")
         return jsonify({
@@ -238,11 +525,83 @@ def download_meeting_document(meeting_id):
             'error': 'Lỗi khi tải tài liệu'
         }), 500
 
+@meeting_bp.route('/<int:meeting_id>/summary/stream', methods=['POST'])
+def stream_meeting_summary(meeting_id):
+    """
+    Tạo lại tóm tắt cuộc họp và stream về client (Server-Sent Events)
+    
+    Dùng POST (đọc bằng fetch, không dùng EventSource) vì mỗi lần gọi tốn
+    tokens và ghi đè tóm tắt; EventSource tự kết nối lại sẽ tạo lại tóm tắt.
+    Mỗi đoạn text được gửi ngay khi OpenAI sinh ra; khi hoàn tất, tóm tắt được
+    lưu vào cuộc họp, biên bản (.docx) được tạo lại và event 'done' được gửi.
+    
+    Chỉ cuộc họp đã hoàn thành mới được tạo lại tóm tắt; trong lúc tạo, cuộc
+    họp được giữ ở status 'processing' để không chạy đồng thời với worker,
+    batch_poller.py hoặc một lần tạo lại khác.
+    """
+    meeting = _get_meeting_or_404(meeting_id)
+    
+    if not meeting.transcript:
+        return jsonify({
+            'success': False,
+            'error': 'Cuộc họp chưa có bản ghi'
+        }), 400
+    
+    if llm_service.client is None:
+        return jsonify({
+            'success': False,
+            'error': 'Chưa cấu hình OpenAI API key'
+        }), 503
+    
+    transcript = meeting.transcript
+    meeting_info = _meeting_info(meeting)
+    
+    if not _claim_for_regeneration(meeting_id):
+        return jsonify({
+            'success': False,
+            'error': 'Cuộc họp chưa xử lý xong hoặc đang được xử lý'
+        }), 409
+    
+    def generate():
+        parts = []
+        try:
+            for text in llm_service.iterate(llm_service.stream_meeting_summary(transcript, meeting_info)):
+                parts.append(text)
+                yield f"data: {json.dumps({'text': text}, ensure_ascii=False)}\n\n"
+            
+            meeting = db.session.get(Meeting, meeting_id)
+            if meeting:
+                meeting.summary = ''.join(parts)
+                
+                # Biên bản và các quyết định trong đó được tạo từ summary
+                old_document_path = meeting.document_path
+                _generate_document(meeting)
+                meeting.status = 'completed'
+                db.session.commit()
+                if old_document_path and old_document_path != meeting.document_path:
+                    file_handler.delete_file(old_document_path)
+            
+            yield "event: done\ndata: {}\n\n"
+        
+        except Exception as e:
+            logger.error(f"Error streaming meeting summary: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'error': 'Lỗi khi tạo tóm tắt'}, ensure_ascii=False)}\n\n"
+        
+        finally:
+            # Lỗi hoặc client ngắt kết nối: giữ tóm tắt cũ, trả cuộc họp về 'completed'
+            _release_regeneration(meeting_id)
+    
+    response = current_app.response_class(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Không để nginx buffer response
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @meeting_bp.route('/<int:meeting_id>', methods=['PUT'])
 def update_meeting(meeting_id):
     """Cập nhật thông tin cuộc họp"""
     try:
-        meeting = Meeting.query.get_or_404(meeting_id)
+        meeting = _get_meeting_or_404(meeting_id)
         data = request.get_json()
         
         # Validate dữ liệu
@@ -265,7 +624,6 @@ def update_meeting(meeting_id):
                 else:
                     setattr(meeting, field, data[field])
         
-        meeting.updated_at = datetime.utcnow()
         db.session.commit()
         
         return jsonify({
@@ -273,7 +631,7 @@ def update_meeting(meeting_id):
             'data': meeting.to_dict(),
             'message': 'Cập nhật thành công'
         })
-        
+    
     except Exception as e:
         logger.error(f"Error updating meeting: {str(e)}")
         return jsonify({
@@ -285,7 +643,7 @@ def update_meeting(meeting_id):
 def delete_meeting(meeting_id):
     """Xóa cuộc họp"""
     try:
-        meeting = Meeting.query.get_or_404(meeting_id)
+        meeting = _get_meeting_or_404(meeting_id)
         
         # Xóa các file liên quan
         files_to_delete = [
@@ -306,7 +664,7 @@ def delete_meeting(meeting_id):
             'success': True,
             'message': 'Xóa cuộc họp thành công'
         })
-        
+    
     except Exception as e:
         logger.error(f"Error deleting meeting: {str(e)}")
         return jsonify({
@@ -314,131 +672,235 @@ def delete_meeting(meeting_id):
             'error': 'Lỗi khi xóa cuộc họp'
         }), 500
 
-def process_meeting_async(meeting_id):
-    """Xử lý cuộc họp trong background"""
-    from .. import create_app
-    
-    # Tạo app context cho background thread
-    app = create_app()
+def _maybe_commit(meeting, force=False):
+    """
+    Commit tiến độ xử lý của cuộc họp
     
+    Các cập nhật tiến độ trung gian chỉ được commit nếu đã qua
+    PROGRESS_COMMIT_INTERVAL giây kể từ lần commit trước; các thay đổi
+    status (force=True) luôn được commit ngay.
+    """
+    now = time.monotonic()
+    last_commit = getattr(_progress_state, 'last_commit', None)
+    if force or last_commit is None or now - last_commit >= PROGRESS_COMMIT_INTERVAL:
+        db.session.commit()
+        _progress_state.last_commit = now
+
+def process_meeting_async(app, meeting_id):
+    """Xử lý cuộc họp trong background"""
+    # Dùng lại app đã khởi tạo, chỉ cần push app context cho worker thread
     with app.app_context():
         try:
-            meeting = Meeting.query.get(meeting_id)
+            meeting = db.session.get(Meeting, meeting_id)
             if not meeting:
-                logger.error(f"Meeting {meeting_id} not found")
+                logger.error("Meeting %s not found", meeting_id)
                 return
             
             # Cập nhật status
             meeting.status = 'processing'
             meeting.processing_progress = 0
-            db.session.commit()
+            _maybe_commit(meeting, force=True)
             
-            logger.info(f"Starting processing for meeting {meeting_id}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Starting processing for meeting %s", meeting_id)
             
-            # Bước 1: Tách âm thanh (nếu là video)
-            audio_path = meeting.file_path
-            if meeting.filename.lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv')):
-                logger.info("Extracting audio from video...")
-                audio_path = audio_processor.extract_audio_from_video(meeting.file_path)
-                if not audio_path:
+            # Bước 1: Decode âm thanh (audio hoặc video) thành float32 trong bộ nhớ
+            logger.info("Decoding audio...")
+            audio = audio_processor.decode_to_float32(meeting.file_path)
+            if audio is None:
+                if _is_video(meeting.filename):
                     raise Exception("Không thể tách âm thanh từ video")
-                meeting.audio_path = audio_path
+                raise Exception("Không thể đọc file âm thanh")
             
             meeting.processing_progress = 20
-            db.session.commit()
+            _maybe_commit(meeting)
             
             # Bước 2: Transcription
             logger.info("Starting transcription...")
-            transcript_data = transcription_service.transcribe_audio(audio_path)
+            transcript_data = transcription_service.transcribe_audio(audio)
             if not transcript_data:
                 raise Exception("Không thể chuyển đổi âm thanh thành văn bản")
             
             meeting.transcript = transcript_data['text']
             meeting.processing_progress = 50
-            db.session.commit()
+            _maybe_commit(meeting)
             
             # Bước 3: LLM Analysis
+            if app.config['LLM_BATCH_MODE'] and llm_service.client is not None:
+                logger.info("Submitting LLM analysis batch...")
+                batch_id = llm_service.run(llm_service.submit_batch([
+                    (str(meeting.id), meeting.transcript, _meeting_info(meeting))
+                ]))
+                if batch_id:
+                    # Kết quả được cập nhật bởi batch_poller.py khi batch hoàn thành
+                    meeting.llm_batch_id = batch_id
+                    _maybe_commit(meeting, force=True)
+                    return
+                
+                logger.warning("Could not submit LLM batch, falling back to direct requests")
+            
             logger.info("Starting LLM analysis...")
             
-            # Tạo summary
-            summary_result = llm_service.generate_meeting_summary(
-                transcript_data['text'],
-                {
-                    'title': meeting.title,
-                    'duration': meeting.duration,
-                    'filename': meeting.filename
-                }
+            # Tóm tắt, action items và participants là 3 request độc lập, chạy song song
+            summary_result, action_items, participants = llm_service.run(
+                llm_service.process_meeting(meeting.transcript, _meeting_info(meeting))
             )
             
-            if summary_result:
-                meeting.summary = summary_result['summary']
-            
-            meeting.processing_progress = 70
-            db.session.commit()
-            
-            # Trích xuất action items
-            action_items = llm_service.extract_action_items(transcript_data['text'])
-            if action_items:
-                meeting.set_action_items(action_items)
-            
-            # Xác định participants
-            participants = llm_service.identify_participants(transcript_data['text'])
-            if participants:
-                meeting.set_participants(participants)
-            
-            meeting.processing_progress = 85
-            db.session.commit()
-            
-            # Bước 4: Tạo document
-            logger.info("Generating document...")
-            document_path = document_generator.create_meeting_minutes(meeting.to_dict())
-            if document_path:
-                meeting.document_path = document_path
-            
-            # Hoàn thành
-            meeting.status = 'completed'
-            meeting.processing_progress = 100
-            meeting.processed_at = datetime.utcnow()
-            db.session.commit()
-            
-            logger.info(f"Meeting {meeting_id} processed successfully")
-            
+            _finish_processing(meeting, summary_result, action_items, participants)
+        
         except Exception as e:
-            logger.error(f"Error processing meeting {meeting_id}: {str(e)}")
+            logger.error("Error processing meeting %s: %s", meeting_id, e)
             
             # Cập nhật status lỗi
-            meeting = Meeting.query.get(meeting_id)
+            meeting = db.session.get(Meeting, meeting_id)
             if meeting:
                 meeting.status = 'failed'
                 meeting.error_message = str(e)
-                db.session.commit()
+                _maybe_commit(meeting, force=True)
+
+def _meeting_info(meeting):
+    """Thông tin bổ sung về cuộc họp gửi kèm prompt tóm tắt"""
+    return {
+        'title': meeting.title,
+        'duration': meeting.duration,
+        'filename': meeting.filename
+    }
+
+def _finish_processing(meeting, summary_result, action_items, participants):
+    """Lưu kết quả phân tích LLM, tạo document và đánh dấu cuộc họp hoàn thành"""
+    if summary_result:
+        meeting.summary = summary_result['summary']
+    
+    if action_items:
+        meeting.set_action_items(action_items)
+    
+    if participants:
+        meeting.set_participants(participants)
+    
+    meeting.llm_batch_id = None
+    meeting.processing_progress = 85
+    _maybe_commit(meeting)
+    
+    # Bước 4: Tạo document
+    _generate_document(meeting)
+    
+    # Hoàn thành
+    meeting.status = 'completed'
+    meeting.processing_progress = 100
+    meeting.processed_at = func.now()
+    _maybe_commit(meeting, force=True)
+    
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Meeting %s processed successfully", meeting.id)
+
+def _generate_document(meeting):
+    """Tạo biên bản (.docx) từ dữ liệu hiện tại của cuộc họp (chưa commit)"""
+    logger.info("Generating document...")
+    document_path = document_generator.create_meeting_minutes(meeting.to_view())
+    if document_path:
+        meeting.document_path = document_path
+        meeting.download_name = f"bien_ban_{meeting.title}_{meeting.id}.docx"
+
+def poll_llm_batches():
+    """
+    Hoàn thành các cuộc họp có OpenAI batch đã kết thúc
+    
+    Chạy định kỳ bởi batch_poller.py trong app context. Batch lỗi hoặc hết hạn
+    thì cuộc họp được phân tích lại bằng request trực tiếp; nếu chỉ một vài
+    request trong batch lỗi thì chỉ các phân tích đó được chạy lại.
+    
+    Returns:
+        Số cuộc họp đã được xử lý xong
+    """
+    batch_ids = db.session.execute(
+        select(Meeting.llm_batch_id)
+        .where(Meeting.status == 'processing', Meeting.llm_batch_id.is_not(None))
+        .distinct()
+    ).scalars().all()
+    
+    finished = 0
+    for batch_id in batch_ids:
+        try:
+            batch = llm_service.run(llm_service.poll_batch(batch_id))
+        except Exception as e:
+            logger.error("Error polling LLM batch %s: %s", batch_id, e)
+            continue
+        
+        if not batch['done']:
+            continue
+        
+        results = {}
+        if batch['status'] == 'completed' and batch['output_file_id']:
+            try:
+                results = llm_service.run(llm_service.fetch_results(batch['output_file_id']))
+            except Exception as e:
+                logger.error("Error fetching results of LLM batch %s: %s", batch_id, e)
+        else:
+            logger.warning(
+                "LLM batch %s ended with status '%s', falling back to direct requests",
+                batch_id, batch['status']
+            )
+        
+        meetings = db.session.execute(
+            select(Meeting).where(Meeting.llm_batch_id == batch_id)
+        ).scalars().all()
+        
+        for meeting in meetings:
+            try:
+                result = results.get(str(meeting.id)) or (None,) * len(MEETING_TASKS)
+                missing = tuple(task for task, value in zip(MEETING_TASKS, result) if value is None)
+                if missing:
+                    fallback = llm_service.run(
+                        llm_service.process_meeting(meeting.transcript, _meeting_info(meeting), tasks=missing)
+                    )
+                    result = tuple(
+                        fallback_value if value is None else value
+                        for value, fallback_value in zip(result, fallback)
+                    )
+                
+                _finish_processing(meeting, *result)
+                finished += 1
+            
+            except Exception as e:
+                logger.error("Error finishing meeting %s: %s", meeting.id, e)
+                db.session.rollback()
+                meeting.status = 'failed'
+                meeting.error_message = str(e)
+                meeting.llm_batch_id = None
+                _maybe_commit(meeting, force=True)
+    
+    return finished
 
 @meeting_bp.route('/stats', methods=['GET'])
+@cache.cached(timeout=STATS_CACHE_TIMEOUT, response_filter=lambda rv: not isinstance(rv, tuple))
 def get_meeting_stats():
     """Lấy thống kê cuộc họp"""
     try:
-        total_meetings = Meeting.query.count()
-        completed_meetings = Meeting.query.filter(Meeting.status == 'completed').count()
-        processing_meetings = Meeting.query.filter(Meeting.status == 'processing').count()
-        failed_meetings = Meeting.query.filter(Meeting.status == 'failed').count()
-        
-        # Tổng thời lượng
-        total_duration = db.session.query(db.func.sum(Meeting.duration)).filter(
-            Meeting.duration.isnot(None)
-        ).scalar() or 0
+        # Một query duy nhất, database tính toàn bộ các giá trị tổng hợp
+        total_meetings, completed_meetings, processing_meetings, failed_meetings, total_duration_hours = db.session.execute(
+            select(
+                func.count(Meeting.id),
+                _count_status('completed'),
+                _count_status('processing'),
+                _count_status('failed'),
+                func.coalesce(func.sum(Meeting.duration), 0) / 3600.0
+            )
+        ).one()
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'data': {
                 'total_meetings': total_meetings,
                 'completed_meetings': completed_meetings,
                 'processing_meetings': processing_meetings,
                 'failed_meetings': failed_meetings,
-                'total_duration_hours': round(total_duration / 3600, 2),
+                'total_duration_hours': round(total_duration_hours, 2),
                 'success_rate': round((completed_meetings / total_meetings * 100), 2) if total_meetings > 0 else 0
             }
         })
-        
+        response.cache_control.max_age = STATS_CACHE_TIMEOUT
+        return response
+    
     except Exception as e:
         logger.error(f"Error getting stats: {str(e)}")
         return jsonify({
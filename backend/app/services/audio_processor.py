@@ -1,15 +1,51 @@
 # backend/app/services/audio_processor.py
 import ffmpeg
+import numpy as np
 import os
+import shutil
 import logging
+import threading
+from collections import OrderedDict
 from typing import Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Số kết quả ffprobe được giữ trong cache
+MEDIA_INFO_CACHE_SIZE = 256
+
+# Định dạng âm thanh Whisper cần: WAV PCM 16-bit, mono, 16kHz
+TARGET_AUDIO_CODEC = 'pcm_s16le'
+TARGET_SAMPLE_RATE = 16000
+TARGET_CHANNELS = 1
+
+# Bỏ đọc stdin, banner và log thông thường để stderr chỉ còn lỗi
+FFMPEG_GLOBAL_ARGS = ('-nostdin', '-hide_banner', '-loglevel', 'error')
+
+def _is_non_empty_file(path: str) -> bool:
+    """Kiểm tra file tồn tại và có dữ liệu, chỉ dùng một lần stat"""
+    try:
+        return os.stat(path).st_size > 0
+    except FileNotFoundError:
+        return False
+
+def _parse_frame_rate(rate: str) -> float:
+    """Parse frame rate dạng "30000/1001" của ffprobe"""
+    num, _, den = rate.partition('/')
+    try:
+        num = int(num)
+        den = int(den) if den else 1
+    except ValueError:
+        return 0.0
+    return num / den if den else 0.0
+
 class AudioProcessor:
     def __init__(self, temp_folder: str):
         self.temp_folder = temp_folder
         os.makedirs(temp_folder, exist_ok=True)
+        
+        # Cache kết quả ffprobe theo (path, mtime, size), LRU
+        self._media_info_cache = OrderedDict()
+        self._media_info_lock = threading.Lock()
     
     def extract_audio_from_video(self, video_path: str, output_path: str = None) -> Optional[str]:
         """
@@ -33,32 +69,57 @@ class AudioProcessor:
                 return None
             
             # Tách âm thanh với FFmpeg
-            (
+            return self._run_ffmpeg_to_wav(video_path, output_path)
+            
+        except Exception as e:
+            logger.error(f"Unexpected error during audio extraction: {str(e)}")
+            return None
+    
+    def decode_to_float32(self, input_path: str) -> Optional[np.ndarray]:
+        """
+        Decode âm thanh (từ file audio hoặc video) thành mảng float32 trong bộ nhớ
+        
+        FFmpeg ghi thẳng raw f32le mono 16kHz ra stdout, đúng định dạng Whisper
+        dùng, nên không cần file WAV tạm và không phải chuyển int16 -> float32.
+        
+        Args:
+            input_path: Đường dẫn file audio/video
+            
+        Returns:
+            Mảng float32 mono 16kHz (chỉ đọc) hoặc None nếu lỗi
+        """
+        try:
+            if not os.path.exists(input_path):
+                logger.error(f"Input file not found: {input_path}")
+                return None
+            
+            pcm_bytes, _ = (
                 ffmpeg
-                .input(video_path)
+                .input(input_path, threads=0)
                 .output(
-                    output_path,
-                    acodec='pcm_s16le',  # WAV format
-                    ac=1,  # Mono channel
-                    ar='16000'  # 16kHz sample rate (tối ưu cho Whisper)
+                    'pipe:',
+                    vn=None,
+                    format='f32le',
+                    ac=TARGET_CHANNELS,
+                    ar=str(TARGET_SAMPLE_RATE)
                 )
-                .overwrite_output()
-                .run(quiet=True, capture_stdout=True)
+                .global_args(*FFMPEG_GLOBAL_ARGS)
+                .run(capture_stdout=True, capture_stderr=True, quiet=True)
             )
             
-            # Kiểm tra file output được tạo thành công
-            if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-                logger.info(f"Audio extracted successfully: {output_path}")
-                return output_path
-            else:
-                logger.error("Audio extraction failed - output file is empty or not created")
+            if not pcm_bytes:
+                logger.error("Audio decoding failed - no audio data")
                 return None
-                
+            
+            audio = np.frombuffer(pcm_bytes, np.float32)
+            logger.info(f"Audio decoded to memory: {len(audio) / TARGET_SAMPLE_RATE:.1f}s")
+            return audio
+            
         except ffmpeg.Error as e:
-            logger.error(f"FFmpeg error during audio extraction: {e.stderr.decode()}")
+            logger.error(f"FFmpeg error during audio decoding: {e.stderr.decode(errors='replace')}")
             return None
         except Exception as e:
-            logger.error(f"Unexpected error during audio extraction: {str(e)}")
+            logger.error(f"Unexpected error during audio decoding: {str(e)}")
             return None
     
     def get_media_info(self, file_path: str) -> Optional[dict]:
@@ -72,40 +133,61 @@ class AudioProcessor:
             Dictionary chứa thông tin media hoặc None nếu lỗi
         """
         try:
-            probe = ffmpeg.probe(file_path)
-            
-            # Tìm stream video và audio
-            video_stream = next((stream for stream in probe['streams'] if stream['codec_type'] == 'video'), None)
-            audio_stream = next((stream for stream in probe['streams'] if stream['codec_type'] == 'audio'), None)
-            
-            info = {
-                'duration': float(probe['format']['duration']),
-                'size': int(probe['format']['size']),
-                'format_name': probe['format']['format_name'],
-                'bit_rate': int(probe['format'].get('bit_rate', 0))
-            }
-            
-            if video_stream:
-                info.update({
-                    'width': int(video_stream.get('width', 0)),
-                    'height': int(video_stream.get('height', 0)),
-                    'video_codec': video_stream.get('codec_name'),
-                    'fps': eval(video_stream.get('r_frame_rate', '0/1'))
-                })
-            
-            if audio_stream:
-                info.update({
-                    'audio_codec': audio_stream.get('codec_name'),
-                    'sample_rate': int(audio_stream.get('sample_rate', 0)),
-                    'channels': int(audio_stream.get('channels', 0))
-                })
-            
-            return info
+            # Mỗi lần ffprobe là một subprocess; file không đổi thì dùng lại kết quả cũ
+            stat = os.stat(file_path)
+            cache_key = (file_path, stat.st_mtime_ns, stat.st_size)
+            
+            with self._media_info_lock:
+                info = self._media_info_cache.get(cache_key)
+                if info is not None:
+                    self._media_info_cache.move_to_end(cache_key)
+                    return dict(info)
+            
+            info = self._probe_media_info(file_path)
+            
+            with self._media_info_lock:
+                self._media_info_cache[cache_key] = info
+                if len(self._media_info_cache) > MEDIA_INFO_CACHE_SIZE:
+                    self._media_info_cache.popitem(last=False)
+            
+            return dict(info)
             
         except Exception as e:
             logger.error(f"Error getting media info: {str(e)}")
             return None
     
+    def _probe_media_info(self, file_path: str) -> dict:
+        """Chạy ffprobe và trích xuất các thông tin cần thiết"""
+        probe = ffmpeg.probe(file_path)
+        
+        # Tìm stream video và audio
+        video_stream = next((stream for stream in probe['streams'] if stream['codec_type'] == 'video'), None)
+        audio_stream = next((stream for stream in probe['streams'] if stream['codec_type'] == 'audio'), None)
+        
+        info = {
+            'duration': float(probe['format']['duration']),
+            'size': int(probe['format']['size']),
+            'format_name': probe['format']['format_name'],
+            'bit_rate': int(probe['format'].get('bit_rate', 0))
+        }
+        
+        if video_stream:
+            info.update({
+                'width': int(video_stream.get('width', 0)),
+                'height': int(video_stream.get('height', 0)),
+                'video_codec': video_stream.get('codec_name'),
+                'fps': _parse_frame_rate(video_stream.get('r_frame_rate', '0/1'))
+            })
+        
+        if audio_stream:
+            info.update({
+                'audio_codec': audio_stream.get('codec_name'),
+                'sample_rate': int(audio_stream.get('sample_rate', 0)),
+                'channels': int(audio_stream.get('channels', 0))
+            })
+        
+        return info
+    
     def convert_to_wav(self, input_path: str, output_path: str = None) -> Optional[str]:
         """
         Chuyển đổi file âm thanh sang định dạng WAV
@@ -122,25 +204,79 @@ class AudioProcessor:
                 base_name = os.path.splitext(os.path.basename(input_path))[0]
                 output_path = os.path.join(self.temp_folder, f"{base_name}.wav")
             
+            return self._run_ffmpeg_to_wav(input_path, output_path)
+            
+        except Exception as e:
+            logger.error(f"Error converting to WAV: {str(e)}")
+            return None
+    
+    def _run_ffmpeg_to_wav(self, input_path: str, output_path: str) -> Optional[str]:
+        """
+        Chuyển input (audio/video) sang WAV PCM 16-bit mono 16kHz
+        
+        Args:
+            input_path: Đường dẫn file input
+            output_path: Đường dẫn file WAV output
+            
+        Returns:
+            Đường dẫn file WAV hoặc None nếu lỗi
+        """
+        # File đã đúng định dạng thì không cần decode/encode lại
+        if self._is_target_wav(input_path):
+            self._link_or_copy(input_path, output_path)
+            logger.info(f"Input is already 16kHz mono WAV, reused: {output_path}")
+            return output_path
+        
+        try:
             (
                 ffmpeg
-                .input(input_path)
+                .input(input_path, threads=0)  # Decode đa luồng theo số CPU
                 .output(
                     output_path,
-                    acodec='pcm_s16le',
-                    ac=1,
-                    ar='16000'
+                    vn=None,  # Chỉ lấy audio, không decode stream video
+                    acodec=TARGET_AUDIO_CODEC,  # WAV format
+                    ac=TARGET_CHANNELS,  # Mono channel
+                    ar=str(TARGET_SAMPLE_RATE)  # 16kHz sample rate (tối ưu cho Whisper)
                 )
+                .global_args(*FFMPEG_GLOBAL_ARGS)
                 .overwrite_output()
                 .run(quiet=True, capture_stdout=True)
             )
-            
-            if os.path.exists(output_path):
-                logger.info(f"Audio converted to WAV: {output_path}")
-                return output_path
-            else:
-                return None
-                
-        except Exception as e:
-            logger.error(f"Error converting to WAV: {str(e)}")
+        except ffmpeg.Error as e:
+            logger.error(f"FFmpeg error during WAV conversion: {e.stderr.decode(errors='replace')}")
             return None
+        
+        # Kiểm tra file output được tạo thành công
+        if _is_non_empty_file(output_path):
+            logger.info(f"Audio converted to WAV: {output_path}")
+            return output_path
+        
+        logger.error("WAV conversion failed - output file is empty or not created")
+        return None
+    
+    def _is_target_wav(self, file_path: str) -> bool:
+        """Kiểm tra file đã là WAV PCM 16-bit mono 16kHz (không có video) hay chưa"""
+        info = self.get_media_info(file_path)
+        if not info or 'video_codec' in info:
+            return False
+        
+        return (
+            info.get('audio_codec') == TARGET_AUDIO_CODEC and
+            info.get('sample_rate') == TARGET_SAMPLE_RATE and
+            info.get('channels') == TARGET_CHANNELS
+        )
+    
+    def _link_or_copy(self, source_path: str, output_path: str):
+        """Hard link file sang output_path, copy nếu không link được (khác filesystem...)"""
+        if os.path.abspath(source_path) == os.path.abspath(output_path):
+            return
+        
+        try:
+            os.remove(output_path)
+        except FileNotFoundError:
+            pass
+        
+        try:
+            os.link(source_path, output_path)
+        except OSError:
+            shutil.copyfile(source_path, output_path)
@@ -3,14 +3,96 @@ from docx import Document
 from docx.shared import Inches, Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from copy import deepcopy
+from functools import lru_cache
 import os
+import re
 import logging
+import zipfile
+from io import BytesIO
+from xml.sax.saxutils import escape
+from collections.abc import Mapping
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 
+from ..utils.summary_parser import split_summary, extract_items
 
 logger = logging.getLogger(__name__)
 
+# Các sections hiển thị trong phần nội dung chính (header trong summary -> tên hiển thị)
+_CONTENT_SECTIONS = [
+    ('MỤC ĐÍCH CUỘC HỌP', 'Mục đích cuộc họp'),
+    ('NỘI DUNG THẢO LUẬN', 'Nội dung thảo luận'),
+    ('VẤN ĐỀ CẦN THEO DÕI', 'Vấn đề cần theo dõi'),
+    ('CUỘC HỌP TIẾP THEO', 'Cuộc họp tiếp theo')
+]
+_DECISIONS_SECTION = 'QUYẾT ĐỊNH'
+
+# Số thứ tự các phần của biên bản
+_ROMAN_NUMERALS = ('I', 'II', 'III', 'IV', 'V', 'VI')
+
+_DISPLAY_DATETIME_FORMAT = "%d/%m/%Y %H:%M"
+
+@lru_cache(maxsize=1024)
+def _parse_iso(value: str) -> str:
+    """Chuyển chuỗi ISO datetime sang định dạng hiển thị, giữ nguyên nếu không parse được"""
+    # fromisoformat của Python < 3.11 không nhận hậu tố 'Z'
+    iso_value = value[:-1] + '+00:00' if value.endswith('Z') else value
+    try:
+        return datetime.fromisoformat(iso_value).strftime(_DISPLAY_DATETIME_FORMAT)
+    except ValueError:
+        return value
+
+@lru_cache(maxsize=1024)
+def _format_duration_cached(total_seconds: int) -> str:
+    """Định dạng thời lượng (số giây nguyên), cache theo giá trị"""
+    hours, remainder = divmod(total_seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    
+    if hours > 0:
+        return f"{hours} giờ {minutes} phút"
+    elif minutes > 0:
+        return f"{minutes} phút {seconds} giây"
+    else:
+        return f"{seconds} giây"
+
+# Ký tự điều khiển không hợp lệ trong XML 1.0
+_INVALID_XML_CHARS_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_DOCUMENT_PART = 'word/document.xml'
+
+def _p_xml_string(text: str, style_id: str) -> str:
+    """Tạo chuỗi XML <w:p> với style cho trước"""
+    if not text:
+        return f'<w:p><w:pPr><w:pStyle w:val="{style_id}"/></w:pPr></w:p>'
+    
+    text = escape(_INVALID_XML_CHARS_RE.sub('', text))
+    return (
+        f'<w:p><w:pPr><w:pStyle w:val="{style_id}"/></w:pPr>'
+        f'<w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p>'
+    )
+
+def _make_p_xml(text: str, style_id: str):
+    """Tạo trực tiếp phần tử <w:p> với style cho trước, không qua wrapper Paragraph"""
+    p = OxmlElement('w:p')
+    p_pr = OxmlElement('w:pPr')
+    p_style = OxmlElement('w:pStyle')
+    p_style.set(qn('w:val'), style_id)
+    p_pr.append(p_style)
+    p.append(p_pr)
+    
+    if text:
+        r = OxmlElement('w:r')
+        t = OxmlElement('w:t')
+        t.set(qn('xml:space'), 'preserve')
+        t.text = text
+        r.append(t)
+        p.append(r)
+    
+    return p
+
 class DocumentGenerator:
     def __init__(self, output_folder: str):
         """
@@ -21,42 +103,82 @@ class DocumentGenerator:
         """
         self.output_folder = output_folder
         os.makedirs(output_folder, exist_ok=True)
+        
+        # Template đã có sẵn styles, mỗi document mới chỉ cần load lại từ bytes
+        template = Document()
+        self._setup_document_styles(template)
+        template_buffer = BytesIO()
+        template.save(template_buffer)
+        self._template_bytes = template_buffer.getvalue()
+        
+        # Các phần tĩnh của template cho transcript document: chỉ word/document.xml
+        # được tạo lại, phần body được chèn giữa head và tail
+        with zipfile.ZipFile(BytesIO(self._template_bytes)) as template_zip:
+            self._docx_parts = [
+                (name, template_zip.read(name))
+                for name in template_zip.namelist()
+                if name != _DOCUMENT_PART
+            ]
+            document_xml = template_zip.read(_DOCUMENT_PART).decode('utf-8')
+        
+        body_start = document_xml.index('<w:body>') + len('<w:body>')
+        body_end = document_xml.index('<w:sectPr', body_start)
+        self._document_xml_head = document_xml[:body_start]
+        self._document_xml_tail = document_xml[body_end:]
+    
+    def _new_document(self) -> Document:
+        """Tạo document mới từ template đã cấu hình styles"""
+        return Document(BytesIO(self._template_bytes))
     
     def create_meeting_minutes(self, meeting_data: Dict[str, Any], filename: str = None) -> Optional[str]:
         """
         Tạo file Word biên bản cuộc họp
         
         Args:
-            meeting_data: Dữ liệu cuộc họp
+            meeting_data: Dữ liệu cuộc họp (dict hoặc view từ Meeting.to_view())
             filename: Tên file output (optional)
             
         Returns:
             Đường dẫn file đã tạo hoặc None nếu lỗi
         """
         try:
-            # Tạo document mới
-            doc = Document()
+            if not isinstance(meeting_data, Mapping):
+                meeting_data = vars(meeting_data)
             
-            # Cấu hình styles
-            self._setup_document_styles(doc)
+            # Tạo document mới (styles đã có trong template)
+            doc = self._new_document()
             
             # Thêm header
             self._add_header(doc, meeting_data)
             
+            # Số La Mã của các phần, chỉ đánh số những phần có dữ liệu
+            numerals = iter(_ROMAN_NUMERALS)
+            
             # Thêm thông tin chung
-            self._add_general_info(doc, meeting_data)
+            self._add_general_info(doc, meeting_data, next(numerals))
+            
+            has_content = bool(meeting_data.get('summary') or meeting_data.get('transcript'))
+            decisions = self._collect_decisions(meeting_data)
+            action_items = meeting_data.get('action_items') or []
             
             # Thêm nội dung chính
-            self._add_main_content(doc, meeting_data)
+            if has_content:
+                self._add_main_content(doc, meeting_data, next(numerals))
             
             # Thêm quyết định
-            self._add_decisions(doc, meeting_data)
+            if decisions:
+                self._add_decisions(doc, decisions, next(numerals))
             
             # Thêm nhiệm vụ cần làm
-            self._add_action_items(doc, meeting_data)
+            if action_items:
+                self._add_action_items(doc, action_items, next(numerals))
+            
+            # Không có phần nào ở trên: chỉ thêm một phần thông báo
+            if not (has_content or decisions or action_items):
+                self._add_empty_content(doc, next(numerals))
             
             # Thêm phần kết
-            self._add_footer_section(doc, meeting_data)
+            self._add_footer_section(doc, meeting_data, next(numerals))
             
             # Tạo tên file nếu chưa có
             if not filename:
@@ -79,6 +201,10 @@ class DocumentGenerator:
     
     def _setup_document_styles(self, doc: Document):
         """Cấu hình styles cho document"""
+        # Document tạo từ template đã có styles
+        if 'CustomTitle' in doc.styles:
+            return
+        
         try:
             # Style cho tiêu đề chính
             title_style = doc.styles.add_style('CustomTitle', WD_STYLE_TYPE.PARAGRAPH)
@@ -89,6 +215,14 @@ class DocumentGenerator:
             title_style.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
             title_style.paragraph_format.space_after = Pt(12)
             
+            # Style cho tên cuộc họp dưới tiêu đề chính
+            subtitle_style = doc.styles.add_style('CustomSubtitle', WD_STYLE_TYPE.PARAGRAPH)
+            subtitle_font = subtitle_style.font
+            subtitle_font.name = 'Times New Roman'
+            subtitle_font.size = Pt(14)
+            subtitle_font.bold = True
+            subtitle_style.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            
             # Style cho tiêu đề phần
             heading_style = doc.styles.add_style('CustomHeading', WD_STYLE_TYPE.PARAGRAPH)
             heading_font = heading_style.font
@@ -105,49 +239,83 @@ class DocumentGenerator:
             content_font.size = Pt(11)
             content_style.paragraph_format.line_spacing = 1.15
             
+            # Style cho ô tiêu đề và ô nội dung của bảng
+            table_header_style = doc.styles.add_style('CustomTableHeader', WD_STYLE_TYPE.PARAGRAPH)
+            table_header_font = table_header_style.font
+            table_header_font.name = 'Times New Roman'
+            table_header_font.size = Pt(11)
+            table_header_font.bold = True
+            table_header_style.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            
+            table_text_style = doc.styles.add_style('CustomTableText', WD_STYLE_TYPE.PARAGRAPH)
+            table_text_font = table_text_style.font
+            table_text_font.name = 'Times New Roman'
+            table_text_font.size = Pt(10)
+            
+            # Style cho bảng chữ ký
+            signature_style = doc.styles.add_style('CustomSignature', WD_STYLE_TYPE.PARAGRAPH)
+            signature_font = signature_style.font
+            signature_font.name = 'Times New Roman'
+            signature_font.size = Pt(11)
+            signature_style.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            
+            # Style cho nội dung transcript
+            transcript_style = doc.styles.add_style('CustomTranscript', WD_STYLE_TYPE.PARAGRAPH)
+            transcript_font = transcript_style.font
+            transcript_font.name = 'Times New Roman'
+            transcript_font.size = Pt(11)
+            transcript_style.paragraph_format.line_spacing = 1.5
+            
         except Exception as e:
             logger.warning(f"Could not create custom styles: {str(e)}")
     
+    def _add_styled_paragraph(self, doc: Document, text: str, style_name: str,
+                              bold: bool = False, indent: float = None):
+        """
+        Thêm paragraph dùng style có sẵn thay vì set font cho từng run
+        
+        Args:
+            doc: Document
+            text: Nội dung paragraph
+            style_name: Tên style (CustomTitle, CustomHeading, CustomContent...)
+            bold: In đậm nội dung
+            indent: Thụt lề trái (inches)
+            
+        Returns:
+            Paragraph vừa thêm
+        """
+        paragraph = doc.add_paragraph(style=style_name)
+        run = paragraph.add_run(text)
+        if bold:
+            run.bold = True
+        if indent is not None:
+            paragraph.paragraph_format.left_indent = Inches(indent)
+        return paragraph
+    
     def _add_header(self, doc: Document, meeting_data: Dict[str, Any]):
         """Thêm header cho document"""
         # Tiêu đề chính
-        title = doc.add_paragraph()
-        title_run = title.add_run("BIÊN BẢN CUỘC HỌP")
-        title_run.font.name = 'Times New Roman'
-        title_run.font.size = Pt(16)
-        title_run.bold = True
-        title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        self._add_styled_paragraph(doc, "BIÊN BẢN CUỘC HỌP", 'CustomTitle')
         
         # Tên cuộc họp
         if meeting_data.get('title'):
-            meeting_title = doc.add_paragraph()
-            meeting_title_run = meeting_title.add_run(meeting_data['title'].upper())
-            meeting_title_run.font.name = 'Times New Roman'
-            meeting_title_run.font.size = Pt(14)
-            meeting_title_run.bold = True
-            meeting_title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            self._add_styled_paragraph(doc, meeting_data['title'].upper(), 'CustomSubtitle')
         
         # Thêm dòng trống
         doc.add_paragraph()
     
-    def _add_general_info(self, doc: Document, meeting_data: Dict[str, Any]):
+    def _add_general_info(self, doc: Document, meeting_data: Dict[str, Any], numeral: str):
         """Thêm thông tin chung"""
         # Tiêu đề phần
-        heading = doc.add_paragraph()
-        heading_run = heading.add_run("I. THÔNG TIN CHUNG")
-        heading_run.font.name = 'Times New Roman'
-        heading_run.font.size = Pt(12)
-        heading_run.bold = True
+        self._add_styled_paragraph(doc, f"{numeral}. THÔNG TIN CHUNG", 'CustomHeading')
         
         # Thời gian
-        time_info = meeting_data.get('created_at', datetime.now().strftime("%d/%m/%Y %H:%M"))
-        if isinstance(time_info, str) and 'T' in time_info:
+        time_info = meeting_data.get('created_at') or datetime.now()
+        if isinstance(time_info, datetime):
+            time_info = time_info.strftime(_DISPLAY_DATETIME_FORMAT)
+        elif isinstance(time_info, str) and 'T' in time_info:
             # Convert ISO format to Vietnamese format
-            try:
-                dt = datetime.fromisoformat(time_info.replace('Z', '+00:00'))
-                time_info = dt.strftime("%d/%m/%Y %H:%M")
-            except:
-                pass
+            time_info = _parse_iso(time_info)
         
         info_items = [
             f"- Thời gian: {time_info}",
@@ -165,21 +333,14 @@ class DocumentGenerator:
         
         # Thêm thông tin vào document
         for item in info_items:
-            p = doc.add_paragraph()
-            run = p.add_run(item)
-            run.font.name = 'Times New Roman'
-            run.font.size = Pt(11)
+            self._add_styled_paragraph(doc, item, 'CustomContent')
         
         doc.add_paragraph()  # Dòng trống
     
-    def _add_main_content(self, doc: Document, meeting_data: Dict[str, Any]):
+    def _add_main_content(self, doc: Document, meeting_data: Dict[str, Any], numeral: str):
         """Thêm nội dung chính của cuộc họp"""
         # Tiêu đề phần
-        heading = doc.add_paragraph()
-        heading_run = heading.add_run("II. NỘI DUNG CUỘC HỌP")
-        heading_run.font.name = 'Times New Roman'
-        heading_run.font.size = Pt(12)
-        heading_run.bold = True
+        self._add_styled_paragraph(doc, f"{numeral}. NỘI DUNG CUỘC HỌP", 'CustomHeading')
         
         # Tóm tắt nội dung
         summary = meeting_data.get('summary', '')
@@ -190,143 +351,100 @@ class DocumentGenerator:
             for section_title, section_content in sections.items():
                 if section_content.strip():
                     # Tiêu đề phần con
-                    sub_heading = doc.add_paragraph()
-                    sub_heading_run = sub_heading.add_run(f"2.{len(sections)}. {section_title}")
-                    sub_heading_run.font.name = 'Times New Roman'
-                    sub_heading_run.font.size = Pt(11)
-                    sub_heading_run.bold = True
+                    self._add_styled_paragraph(doc, f"2.{len(sections)}. {section_title}", 'CustomContent', bold=True)
                     
                     # Nội dung
-                    content_p = doc.add_paragraph()
-                    content_run = content_p.add_run(section_content.strip())
-                    content_run.font.name = 'Times New Roman'
-                    content_run.font.size = Pt(11)
-                    content_p.paragraph_format.left_indent = Inches(0.25)
+                    self._add_styled_paragraph(doc, section_content.strip(), 'CustomContent', indent=0.25)
         else:
             # Nếu không có summary, hiển thị transcript
             transcript = meeting_data.get('transcript', '')
             if transcript:
-                content_p = doc.add_paragraph()
-                content_run = content_p.add_run("Nội dung cuộc họp được ghi âm và chuyển đổi tự động:")
-                content_run.font.name = 'Times New Roman'
-                content_run.font.size = Pt(11)
+                self._add_styled_paragraph(doc, "Nội dung cuộc họp được ghi âm và chuyển đổi tự động:", 'CustomContent')
                 
-                # Thêm transcript (giới hạn độ dài)
+                # Thêm transcript (giới hạn độ dài), cỡ chữ nhỏ hơn nội dung
                 transcript_preview = transcript[:2000] + "..." if len(transcript) > 2000 else transcript
-                transcript_p = doc.add_paragraph()
-                transcript_run = transcript_p.add_run(transcript_preview)
-                transcript_run.font.name = 'Times New Roman'
-                transcript_run.font.size = Pt(10)
-                transcript_p.paragraph_format.left_indent = Inches(0.25)
+                transcript_p = self._add_styled_paragraph(doc, transcript_preview, 'CustomContent', indent=0.25)
+                transcript_p.runs[0].font.size = Pt(10)
         
         doc.add_paragraph()  # Dòng trống
     
-    def _add_decisions(self, doc: Document, meeting_data: Dict[str, Any]):
-        """Thêm các quyết định"""
-        # Tiêu đề phần
-        heading = doc.add_paragraph()
-        heading_run = heading.add_run("III. CÁC QUYẾT ĐỊNH")
-        heading_run.font.name = 'Times New Roman'
-        heading_run.font.size = Pt(12)
-        heading_run.bold = True
-        
-        # Trích xuất quyết định từ summary hoặc parsed data
-        decisions = []
-        
+    def _collect_decisions(self, meeting_data: Dict[str, Any]) -> List[str]:
+        """Trích xuất quyết định từ parsed data hoặc summary"""
         # Thử lấy từ parsed data trước
         parsed_data = meeting_data.get('parsed_data', {})
-        if parsed_data and 'decisions' in parsed_data:
-            decisions = parsed_data['decisions']
+        if parsed_data and parsed_data.get('decisions'):
+            return parsed_data['decisions']
         
         # Nếu không có, thử parse từ summary
-        if not decisions:
-            summary = meeting_data.get('summary', '')
-            decisions = self._extract_decisions_from_summary(summary)
-        
-        if decisions:
-            for i, decision in enumerate(decisions, 1):
-                decision_p = doc.add_paragraph()
-                decision_run = decision_p.add_run(f"{i}. {decision}")
-                decision_run.font.name = 'Times New Roman'
-                decision_run.font.size = Pt(11)
-                decision_p.paragraph_format.left_indent = Inches(0.25)
-        else:
-            no_decisions_p = doc.add_paragraph()
-            no_decisions_run = no_decisions_p.add_run("Không có quyết định cụ thể nào được đưa ra trong cuộc họp này.")
-            no_decisions_run.font.name = 'Times New Roman'
-            no_decisions_run.font.size = Pt(11)
-            no_decisions_p.paragraph_format.left_indent = Inches(0.25)
+        return self._extract_decisions_from_summary(meeting_data.get('summary', ''))
+    
+    def _add_decisions(self, doc: Document, decisions: List[str], numeral: str):
+        """Thêm các quyết định"""
+        # Tiêu đề phần
+        self._add_styled_paragraph(doc, f"{numeral}. CÁC QUYẾT ĐỊNH", 'CustomHeading')
+        
+        for i, decision in enumerate(decisions, 1):
+            self._add_styled_paragraph(doc, f"{i}. {decision}", 'CustomContent', indent=0.25)
+        
+        doc.add_paragraph()  # Dòng trống
+    
+    def _add_empty_content(self, doc: Document, numeral: str):
+        """Thêm một phần thông báo khi cuộc họp không có nội dung, quyết định hay nhiệm vụ"""
+        self._add_styled_paragraph(doc, f"{numeral}. NỘI DUNG CUỘC HỌP", 'CustomHeading')
+        self._add_styled_paragraph(
+            doc, "Không có nội dung, quyết định hay nhiệm vụ nào được ghi nhận trong cuộc họp này.",
+            'CustomContent', indent=0.25
+        )
         
         doc.add_paragraph()  # Dòng trống
     
-    def _add_action_items(self, doc: Document, meeting_data: Dict[str, Any]):
+    def _add_action_items(self, doc: Document, action_items: List[Dict[str, Any]], numeral: str):
         """Thêm nhiệm vụ cần làm"""
         # Tiêu đề phần
-        heading = doc.add_paragraph()
-        heading_run = heading.add_run("IV. NHIỆM VỤ CẦN LÀM")
-        heading_run.font.name = 'Times New Roman'
-        heading_run.font.size = Pt(12)
-        heading_run.bold = True
-        
-        action_items = meeting_data.get('action_items', [])
-        
-        if action_items:
-            # Tạo bảng cho action items
-            table = doc.add_table(rows=1, cols=4)
-            table.style = 'Table Grid'
-            
-            # Header row
-            header_cells = table.rows[0].cells
-            headers = ['STT', 'Nhiệm vụ', 'Người chịu trách nhiệm', 'Deadline']
-            
-            for i, header in enumerate(headers):
-                header_cells[i].text = header
-                # Format header
-                for paragraph in header_cells[i].paragraphs:
-                    for run in paragraph.runs:
-                        run.font.name = 'Times New Roman'
-                        run.font.size = Pt(11)
-                        run.bold = True
-                    paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            
-            # Data rows
-            for i, item in enumerate(action_items, 1):
-                row_cells = table.add_row().cells
-                row_cells[0].text = str(i)
-                row_cells[1].text = item.get('task', '')
-                row_cells[2].text = item.get('assignee', 'Chưa xác định')
-                row_cells[3].text = item.get('deadline', 'Chưa xác định')
-                
-                # Format cells
-                for cell in row_cells:
-                    for paragraph in cell.paragraphs:
-                        for run in paragraph.runs:
-                            run.font.name = 'Times New Roman'
-                            run.font.size = Pt(10)
-        else:
-            no_actions_p = doc.add_paragraph()
-            no_actions_run = no_actions_p.add_run("Không có nhiệm vụ cụ thể nào được giao trong cuộc họp này.")
-            no_actions_run.font.name = 'Times New Roman'
-            no_actions_run.font.size = Pt(11)
-            no_actions_p.paragraph_format.left_indent = Inches(0.25)
+        self._add_styled_paragraph(doc, f"{numeral}. NHIỆM VỤ CẦN LÀM", 'CustomHeading')
+        
+        # Tạo bảng cho action items
+        table = doc.add_table(rows=1, cols=4)
+        table.style = 'Table Grid'
+        
+        # Header row
+        header_cells = table.rows[0].cells
+        headers = ['STT', 'Nhiệm vụ', 'Người chịu trách nhiệm', 'Deadline']
+        
+        for i, header in enumerate(headers):
+            paragraph = header_cells[i].paragraphs[0]
+            paragraph.style = 'CustomTableHeader'
+            paragraph.add_run(header)
+        
+        # Data rows: dựng thẳng XML <w:tr>, dùng lại độ rộng cột (tcPr) của header
+        cell_properties = [cell._tc.tcPr for cell in header_cells]
+        
+        for i, item in enumerate(action_items, 1):
+            values = [
+                str(i),
+                item.get('task', ''),
+                item.get('assignee', 'Chưa xác định'),
+                item.get('deadline', 'Chưa xác định')
+            ]
+            
+            tr = OxmlElement('w:tr')
+            for tc_pr, value in zip(cell_properties, values):
+                tc = OxmlElement('w:tc')
+                if tc_pr is not None:
+                    tc.append(deepcopy(tc_pr))
+                tc.append(_make_p_xml(value, 'CustomTableText'))
+                tr.append(tc)
+            table._tbl.append(tr)
         
         doc.add_paragraph()  # Dòng trống
     
-    def _add_footer_section(self, doc: Document, meeting_data: Dict[str, Any]):
+    def _add_footer_section(self, doc: Document, meeting_data: Dict[str, Any], numeral: str):
         """Thêm phần kết"""
         # Kết thúc cuộc họp
-        heading = doc.add_paragraph()
-        heading_run = heading.add_run("V. KẾT THÚC CUỘC HỌP")
-        heading_run.font.name = 'Times New Roman'
-        heading_run.font.size = Pt(12)
-        heading_run.bold = True
+        self._add_styled_paragraph(doc, f"{numeral}. KẾT THÚC CUỘC HỌP", 'CustomHeading')
         
         end_time = datetime.now().strftime("%H:%M ngày %d/%m/%Y")
-        end_p = doc.add_paragraph()
-        end_run = end_p.add_run(f"Cuộc họp kết thúc lúc {end_time}.")
-        end_run.font.name = 'Times New Roman'
-        end_run.font.size = Pt(11)
-        end_p.paragraph_format.left_indent = Inches(0.25)
+        self._add_styled_paragraph(doc, f"Cuộc họp kết thúc lúc {end_time}.", 'CustomContent', indent=0.25)
         
         # Chữ ký
         doc.add_paragraph()
@@ -335,79 +453,42 @@ class DocumentGenerator:
         signature_table = doc.add_table(rows=3, cols=2)
         signature_table.autofit = False
         
-        # Left column - Người ghi biên bản
-        left_cells = [signature_table.cell(i, 0) for i in range(3)]
-        left_cells[0].text = "NGƯỜI GHI BIÊN BẢN"
-        left_cells[1].text = "(Ký tên)"
-        left_cells[2].text = "[Tên người ghi]"
-        
-        # Right column - Chủ tọa cuộc họp
-        right_cells = [signature_table.cell(i, 1) for i in range(3)]
-        right_cells[0].text = "CHỦ TỌA CUỘC HỌP"
-        right_cells[1].text = "(Ký tên)"
-        right_cells[2].text = "[Tên chủ tọa]"
-        
-        # Format signature table
-        for row in signature_table.rows:
-            for cell in row.cells:
-                for paragraph in cell.paragraphs:
-                    paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                    for run in paragraph.runs:
-                        run.font.name = 'Times New Roman'
-                        run.font.size = Pt(11)
-                        if "NGƯỜI GHI" in run.text or "CHỦ TỌA" in run.text:
-                            run.bold = True
+        # Left column - Người ghi biên bản, right column - Chủ tọa cuộc họp
+        signature_rows = [
+            ("NGƯỜI GHI BIÊN BẢN", "CHỦ TỌA CUỘC HỌP"),
+            ("(Ký tên)", "(Ký tên)"),
+            ("[Tên người ghi]", "[Tên chủ tọa]")
+        ]
+        
+        # Style căn giữa cho cả bảng, chỉ dòng chức danh in đậm
+        for row_index, row_texts in enumerate(signature_rows):
+            for col_index, text in enumerate(row_texts):
+                paragraph = signature_table.cell(row_index, col_index).paragraphs[0]
+                paragraph.style = 'CustomSignature'
+                run = paragraph.add_run(text)
+                if row_index == 0:
+                    run.bold = True
     
     def _format_duration(self, duration_seconds: float) -> str:
         """Chuyển đổi thời lượng từ giây sang định dạng dễ đọc"""
         if not duration_seconds:
             return "Không xác định"
         
-        hours = int(duration_seconds // 3600)
-        minutes = int((duration_seconds % 3600) // 60)
-        seconds = int(duration_seconds % 60)
-        
-        if hours > 0:
-            return f"{hours} giờ {minutes} phút"
-        elif minutes > 0:
-            return f"{minutes} phút {seconds} giây"
-        else:
-            return f"{seconds} giây"
+        return _format_duration_cached(int(duration_seconds))
     
     def _parse_summary_sections(self, summary: str) -> Dict[str, str]:
         """Parse summary thành các sections"""
-        sections = {}
-        
-        # Các pattern để tìm sections
-        patterns = [
-            (r'2\. MỤC ĐÍCH CUỘC HỌP:(.*?)3\. NỘI DUNG', 'Mục đích cuộc họp'),
-            (r'3\. NỘI DUNG THẢO LUẬN:(.*?)4\. QUYẾT ĐỊNH', 'Nội dung thảo luận'),
-            (r'6\. VẤN ĐỀ CẦN THEO DÕI:(.*?)7\. CUỘC HỌP', 'Vấn đề cần theo dõi'),
-            (r'7\. CUỘC HỌP TIẾP THEO:(.*?)$', 'Cuộc họp tiếp theo')
-        ]
+        bodies = split_summary(summary)
         
-        for pattern, section_name in patterns:
-            import re
-            match = re.search(pattern, summary, re.DOTALL)
-            if match:
-                sections[section_name] = match.group(1).strip()
-        
-        return sections
+        return {
+            section_name: bodies[header].strip()
+            for header, section_name in _CONTENT_SECTIONS
+            if header in bodies
+        }
     
     def _extract_decisions_from_summary(self, summary: str) -> List[str]:
         """Trích xuất decisions từ summary"""
-        decisions = []
-        
-        import re
-        # Tìm phần quyết định
-        decisions_match = re.search(r'4\. QUYẾT ĐỊNH:(.*?)5\. NHIỆM VỤ', summary, re.DOTALL)
-        if decisions_match:
-            decisions_text = decisions_match.group(1)
-            # Tìm các items bắt đầu bằng -
-            decision_items = re.findall(r'- (.*)', decisions_text)
-            decisions = [item.strip() for item in decision_items if item.strip()]
-        
-        return decisions
+        return extract_items(split_summary(summary).get(_DECISIONS_SECTION))
     
     def create_transcript_document(self, meeting_data: Dict[str, Any], filename: str = None) -> Optional[str]:
         """
@@ -421,55 +502,29 @@ class DocumentGenerator:
             Đường dẫn file đã tạo hoặc None nếu lỗi
         """
         try:
-            doc = Document()
-            
-            # Tiêu đề
-            title = doc.add_paragraph()
-            title_run = title.add_run("BẢN GHI ÂM CUỘC HỌP")
-            title_run.font.name = 'Times New Roman'
-            title_run.font.size = Pt(16)
-            title_run.bold = True
-            title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            # Document có cấu trúc đơn giản nên dựng thẳng word/document.xml bằng chuỗi,
+            # không qua object model của python-docx
+            paragraphs = [_p_xml_string("BẢN GHI ÂM CUỘC HỌP", 'CustomTitle')]
             
             # Thông tin cuộc họp
             if meeting_data.get('title'):
-                meeting_title = doc.add_paragraph()
-                meeting_title_run = meeting_title.add_run(meeting_data['title'])
-                meeting_title_run.font.name = 'Times New Roman'
-                meeting_title_run.font.size = Pt(14)
-                meeting_title_run.bold = True
-                meeting_title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+                paragraphs.append(_p_xml_string(meeting_data['title'], 'CustomSubtitle'))
             
-            doc.add_paragraph()
+            paragraphs.append('<w:p/>')
             
             # Thông tin file
-            info_p = doc.add_paragraph()
-            info_run = info_p.add_run(f"File: {meeting_data.get('filename', 'N/A')}")
-            info_run.font.name = 'Times New Roman'
-            info_run.font.size = Pt(11)
-            
-            duration_p = doc.add_paragraph()
-            duration_run = duration_p.add_run(f"Thời lượng: {self._format_duration(meeting_data.get('duration', 0))}")
-            duration_run.font.name = 'Times New Roman'
-            duration_run.font.size = Pt(11)
+            paragraphs.append(_p_xml_string(f"File: {meeting_data.get('filename', 'N/A')}", 'CustomContent'))
+            paragraphs.append(_p_xml_string(
+                f"Thời lượng: {self._format_duration(meeting_data.get('duration', 0))}", 'CustomContent'
+            ))
             
-            doc.add_paragraph()
+            paragraphs.append('<w:p/>')
             
-            # Transcript content
+            # Transcript content: mỗi dòng một paragraph
             transcript = meeting_data.get('transcript', '')
             if transcript:
-                transcript_heading = doc.add_paragraph()
-                transcript_heading_run = transcript_heading.add_run("NỘI DUNG BẢN GHI:")
-                transcript_heading_run.font.name = 'Times New Roman'
-                transcript_heading_run.font.size = Pt(12)
-                transcript_heading_run.bold = True
-                
-                # Thêm transcript
-                transcript_p = doc.add_paragraph()
-                transcript_run = transcript_p.add_run(transcript)
-                transcript_run.font.name = 'Times New Roman'
-                transcript_run.font.size = Pt(11)
-                transcript_p.paragraph_format.line_spacing = 1.5
+                paragraphs.append(_p_xml_string("NỘI DUNG BẢN GHI:", 'CustomHeading'))
+                paragraphs.extend(_p_xml_string(line, 'CustomTranscript') for line in transcript.splitlines())
             
             # Tạo tên file
             if not filename:
@@ -478,7 +533,12 @@ class DocumentGenerator:
                 filename = f"transcript_{title}_{timestamp}.docx"
             
             output_path = os.path.join(self.output_folder, filename)
-            doc.save(output_path)
+            
+            document_xml = self._document_xml_head + ''.join(paragraphs) + self._document_xml_tail
+            with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as docx_zip:
+                for name, data in self._docx_parts:
+                    docx_zip.writestr(name, data)
+                docx_zip.writestr(_DOCUMENT_PART, document_xml)
             
             logger.info(f"Transcript document created: {output_path}")
             return output_path
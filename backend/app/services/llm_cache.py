@@ -0,0 +1,93 @@
+# backend/app/services/llm_cache.py
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, List, Any
+
+logger = logging.getLogger(__name__)
+
+class LLMCache:
+    def __init__(self, redis_url: str = None, ttl: int = 7 * 24 * 3600, max_entries: int = 1024):
+        """
+        Cache kết quả LLM theo nội dung request (exact match)
+        
+        Dùng Redis nếu có redis_url (dùng chung giữa các process), nếu không thì
+        cache trong bộ nhớ của process. Chỉ dùng từ event loop của LLMService.
+        
+        Args:
+            redis_url: URL Redis (optional)
+            ttl: Thời gian sống của mỗi entry (seconds)
+            max_entries: Số entry tối đa của cache trong bộ nhớ
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._redis = None
+        
+        if redis_url:
+            from redis import asyncio as redis_asyncio
+            self._redis = redis_asyncio.Redis.from_url(redis_url)
+    
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        """Tạo cache key từ toàn bộ tham số của request"""
+        payload = json.dumps(
+            {
+                "model": model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens
+            },
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return "llm-cache:" + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Lấy kết quả đã cache
+        
+        Returns:
+            Giá trị đã cache hoặc None nếu không có (hoặc cache lỗi)
+        """
+        try:
+            if self._redis is not None:
+                raw = await self._redis.get(key)
+                return json.loads(raw) if raw else None
+            
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            
+            self._entries.move_to_end(key)
+            return value
+        
+        except Exception as e:
+            # Cache lỗi không được làm hỏng request, chỉ coi như cache miss
+            logger.warning(f"Error reading LLM cache: {str(e)}")
+            return None
+    
+    async def set(self, key: str, value: Dict[str, Any], ttl: int = None):
+        """Lưu kết quả vào cache"""
+        ttl = ttl or self.ttl
+        
+        try:
+            if self._redis is not None:
+                await self._redis.set(key, json.dumps(value, ensure_ascii=False), ex=ttl)
+                return
+            
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        
+        except Exception as e:
+            logger.warning(f"Error writing LLM cache: {str(e)}")
+
@@ -1,31 +1,333 @@
 # backend/app/services/llm_service.py
 import openai
+import httpx
+import tiktoken
+import asyncio
 import logging
 import json
-from typing import Optional, Dict, List, Any
+import threading
+from typing import Optional, Dict, List, Any, Coroutine, Tuple, AsyncIterator, Iterator
 import re
 
+from .llm_cache import LLMCache
+from ..utils.summary_parser import split_summary, extract_items
+
 logger = logging.getLogger(__name__)
 
+# System message dùng chung cho mọi request. Cùng với bản ghi cuộc họp đặt ở đầu
+# user message, phần prefix giống hệt nhau giữa các request của một cuộc họp
+# nên OpenAI prompt caching dùng lại được.
+SYSTEM_PROMPT = "Bạn là một AI chuyên gia về việc phân tích và tóm tắt cuộc họp."
+
+# Các phần cố định của prompt: bản ghi cuộc họp, hướng dẫn, thông tin bổ sung
+TRANSCRIPT_HEADER = "BẢN GHI CUỘC HỌP:\n"
+INSTRUCTIONS_HEADER = "\n\n---\nHƯỚNG DẪN:\n"
+MEETING_INFO_HEADER = "\n\nThông tin bổ sung về cuộc họp:\n"
+
+SUMMARY_INSTRUCTIONS = """Phân tích bản ghi cuộc họp ở trên và tạo biên bản cuộc họp chuyên nghiệp, chi tiết theo định dạng:
+
+BIÊN BẢN CUỘC HỌP
+
+1. THÔNG TIN CHUNG:
+- Thời gian: [Trích xuất từ nội dung hoặc thông tin bổ sung]
+- Địa điểm: [Trích xuất từ nội dung]
+- Người tham gia: [Danh sách người tham gia]
+- Người ghi biên bản: [Nếu có]
+
+2. MỤC ĐÍCH CUỘC HỌP:
+- [Mục đích chính của cuộc họp]
+
+3. NỘI DUNG THẢO LUẬN:
+- [Các điểm thảo luận chính, được tổ chức theo chủ đề]
+
+4. QUYẾT ĐỊNH:
+- [Các quyết định quan trọng đã được đưa ra]
+
+5. NHIỆM VỤ CẦN LÀM:
+- [Danh sách công việc cụ thể với người chịu trách nhiệm và deadline]
+
+6. VẤN ĐỀ CẦN THEO DÕI:
+- [Các vấn đề chưa giải quyết hoặc cần theo dõi]
+
+7. CUỘC HỌP TIẾP THEO:
+- [Thông tin về cuộc họp tiếp theo nếu có]
+"""
+
+ACTION_ITEMS_INSTRUCTIONS = """Phân tích bản ghi cuộc họp ở trên và trích xuất tất cả các nhiệm vụ cần làm (action items).
+
+Với mỗi nhiệm vụ, hãy xác định:
+1. Mô tả nhiệm vụ
+2. Người chịu trách nhiệm (nếu có)
+3. Deadline (nếu có)
+4. Mức độ ưu tiên (cao/trung bình/thấp)
+
+Trả về kết quả dưới dạng JSON array với format:
+[
+    {
+        "task": "Mô tả nhiệm vụ",
+        "assignee": "Tên người chịu trách nhiệm",
+        "deadline": "Ngày deadline",
+        "priority": "cao/trung bình/thấp",
+        "status": "pending"
+    }
+]
+"""
+
+PARTICIPANTS_INSTRUCTIONS = """Phân tích bản ghi cuộc họp ở trên và xác định danh sách tất cả người tham gia.
+
+Trả về danh sách tên dưới dạng JSON array:
+["Tên người 1", "Tên người 2", ...]
+
+Chỉ trả về tên thật của người tham gia, không bao gồm "Speaker 1", "Speaker 2".
+"""
+
+# Các thông tin chung được trích xuất (nhãn trong biên bản -> key)
+_INFO_FIELD_RE = re.compile(r'- (Thời gian|Địa điểm): (.*)')
+_INFO_FIELDS = {"Thời gian": "time", "Địa điểm": "location"}
+
+# Tham số chat completion của từng loại request
+SUMMARY_PARAMS = {"max_tokens": 2000, "temperature": 0.3}
+ACTION_ITEMS_PARAMS = {"max_tokens": 1000, "temperature": 0.2}
+PARTICIPANTS_PARAMS = {"max_tokens": 300, "temperature": 0.2}
+
+# Số lần SDK tự retry (exponential backoff) khi gặp lỗi 429/5xx/mất kết nối
+OPENAI_MAX_RETRIES = 4
+OPENAI_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+# Connection pool dùng chung, giữ keep-alive để không phải bắt tay TLS mỗi request
+OPENAI_CONNECTION_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=32)
+
+# Context window của model (tokens), dùng để kiểm tra bản ghi có vừa prompt không
+MODEL_CONTEXT_TOKENS = {"gpt-3.5-turbo": 16385, "gpt-4": 8192}
+DEFAULT_CONTEXT_TOKENS = 4096
+# Tokens dự phòng cho phần định dạng của messages
+PROMPT_TOKEN_MARGIN = 128
+# Đánh dấu phần bị lược bỏ giữa bản ghi quá dài
+TRANSCRIPT_OMISSION_MARK = "\n[...]\n"
+
+# Các phân tích của một cuộc họp, theo thứ tự kết quả của process_meeting
+MEETING_TASKS = ("summary", "action_items", "participants")
+
+# Endpoint và thời hạn xử lý của OpenAI Batch API
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+
+# Các trạng thái kết thúc của một batch
+BATCH_FINAL_STATUSES = frozenset(("completed", "failed", "expired", "cancelled"))
+
 class LLMService:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, max_concurrency: int = 4, cache: LLMCache = None):
         """
         Khởi tạo LLM service với OpenAI API
         
         Args:
             api_key: OpenAI API key
+            max_concurrency: Số request OpenAI tối đa chạy cùng lúc (giới hạn rate limit)
+            cache: Cache kết quả theo nội dung request (optional)
         """
-        openai.api_key = api_key
+        if not api_key:
+            logger.warning("OPENAI_API_KEY is not configured, LLM analysis will be skipped")
+        self.client = None
+        if api_key:
+            self.client = openai.AsyncOpenAI(
+                api_key=api_key,
+                max_retries=OPENAI_MAX_RETRIES,
+                timeout=OPENAI_TIMEOUT,
+                http_client=httpx.AsyncClient(limits=OPENAI_CONNECTION_LIMITS, timeout=OPENAI_TIMEOUT)
+            )
         self.model = "gpt-3.5-turbo"  # Có thể thay đổi thành gpt-4
+        self.cache = cache
+        # Tokenizer của model, load khi dùng lần đầu (False nếu không load được)
+        self._encoding = None
+        self._encoding_lock = threading.Lock()
+        
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Event loop riêng của service, khởi tạo khi dùng lần đầu (sau khi fork)
+        self._loop = None
+        self._loop_lock = threading.Lock()
     
-    def generate_meeting_summary(self, transcript: str, meeting_info: Dict = None) -> Optional[Dict[str, Any]]:
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Lấy event loop của service, tạo thread chạy loop nếu chưa có"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever,
+                    name='llm-event-loop',
+                    daemon=True
+                ).start()
+            return self._loop
+    
+    def run(self, coro: Coroutine) -> Any:
         """
-        Tạo tóm tắt cuộc họp từ transcript
+        Chạy coroutine trên event loop của service từ code đồng bộ (worker thread)
+        
+        Mọi request dùng chung một loop nên AsyncOpenAI client và semaphore
+        được dùng lại giữa các cuộc họp.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop()).result()
+    
+    def iterate(self, agen: AsyncIterator) -> Iterator:
+        """Duyệt async generator trên event loop của service từ code đồng bộ"""
+        loop = self._get_loop()
+        try:
+            while True:
+                try:
+                    yield asyncio.run_coroutine_threadsafe(agen.__anext__(), loop).result()
+                except StopAsyncIteration:
+                    return
+        finally:
+            # Đóng generator (và stream HTTP) nếu người dùng dừng giữa chừng
+            asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result()
+    
+    async def process_meeting(self, transcript: str, meeting_info: Dict = None,
+                              tasks: Tuple[str, ...] = MEETING_TASKS) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]], List[str]]:
+        """
+        Chạy song song tóm tắt, trích xuất action items và xác định người tham gia
+        
+        Args:
+            transcript: Bản ghi cuộc họp
+            meeting_info: Thông tin bổ sung về cuộc họp
+            tasks: Các phân tích cần chạy (mặc định cả ba); phân tích không chạy
+                trả về None
+        
+        Returns:
+            Tuple (summary, action_items, participants)
+        """
+        if self.client is None:
+            return None, [], []
+        
+        # Đếm tokens một lần cho cả ba request, ngoài event loop
+        transcript = await asyncio.to_thread(self._fit_transcript, transcript, meeting_info)
+        
+        runners = {
+            "summary": lambda: self.generate_meeting_summary(transcript, meeting_info),
+            "action_items": lambda: self.extract_action_items(transcript),
+            "participants": lambda: self.identify_participants(transcript)
+        }
+        selected = [task for task in MEETING_TASKS if task in tasks]
+        
+        results = await asyncio.gather(*(runners[task]() for task in selected), return_exceptions=True)
+        
+        outputs = dict.fromkeys(MEETING_TASKS)
+        for task, result in zip(selected, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Error in LLM analysis: {str(result)}")
+                result = None if task == "summary" else []
+            outputs[task] = result
+        
+        return tuple(outputs[task] for task in MEETING_TASKS)
+    
+    async def _chat(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> Tuple[str, int]:
+        """
+        Gọi chat completion, dùng kết quả đã cache nếu request giống hệt
+        
+        Kết quả được cache cả khi temperature > 0: xử lý lại cùng một bản ghi
+        (retry, xử lý lại) nên trả về cùng một biên bản thay vì một bản khác.
+        
+        Returns:
+            Tuple (nội dung trả lời, số tokens đã dùng)
+        """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = LLMCache.make_key(self.model, messages, temperature, max_tokens)
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                return cached['content'], cached['tokens']
+        
+        # Giới hạn số request đồng thời bằng semaphore
+        async with self._semaphore:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+        
+        content = response.choices[0].message.content
+        tokens = response.usage.total_tokens if getattr(response, 'usage', None) else 0
+        
+        if cache_key is not None:
+            await self.cache.set(cache_key, {'content': content, 'tokens': tokens})
+        
+        return content, tokens
+    
+    async def stream_meeting_summary(self, transcript: str, meeting_info: Dict = None) -> AsyncIterator[str]:
+        """
+        Tạo lại tóm tắt cuộc họp, trả về từng đoạn text ngay khi OpenAI sinh ra
+        
+        Luôn gọi OpenAI (không đọc cache), kết quả mới được ghi đè vào cache để
+        các lần phân tích sau dùng bản tóm tắt mới này.
         
         Args:
             transcript: Bản ghi cuộc họp
             meeting_info: Thông tin bổ sung về cuộc họp
+        
+        Yields:
+            Các đoạn text của tóm tắt
+        """
+        transcript = await asyncio.to_thread(self._fit_transcript, transcript, meeting_info)
+        messages = self._build_messages(self._create_summary_prompt(transcript, meeting_info))
+        max_tokens = SUMMARY_PARAMS["max_tokens"]
+        temperature = SUMMARY_PARAMS["temperature"]
+        
+        # Stream của OpenAI được đọc trong task riêng nên semaphore được trả ngay
+        # khi OpenAI trả xong, không phụ thuộc tốc độ đọc của client
+        chunks = asyncio.Queue()
+        reader = asyncio.ensure_future(self._read_chat_stream(messages, max_tokens, temperature, chunks))
+        
+        parts = []
+        try:
+            while True:
+                content = await chunks.get()
+                if content is None:
+                    break
+                parts.append(content)
+                yield content
             
+            # Báo lỗi của stream (nếu có)
+            await reader
+        finally:
+            reader.cancel()
+        
+        if self.cache is not None:
+            # Stream không trả về usage
+            cache_key = LLMCache.make_key(self.model, messages, temperature, max_tokens)
+            await self.cache.set(cache_key, {'content': ''.join(parts), 'tokens': 0})
+    
+    async def _read_chat_stream(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float,
+                                chunks: asyncio.Queue):
+        """Đọc chat completion dạng stream vào queue, kết thúc bằng None"""
+        try:
+            async with self._semaphore:
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    stream=True
+                )
+                try:
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        content = chunk.choices[0].delta.content
+                        if content:
+                            chunks.put_nowait(content)
+                finally:
+                    # Trả connection về pool của client, kể cả khi task bị hủy
+                    # giữa chừng (client SSE ngắt kết nối)
+                    await stream.close()
+        finally:
+            chunks.put_nowait(None)
+    
+    async def generate_meeting_summary(self, transcript: str, meeting_info: Dict = None) -> Optional[Dict[str, Any]]:
+        """
+        Tạo tóm tắt cuộc họp từ transcript
+        
+        Args:
+            transcript: Bản ghi cuộc họp
+            meeting_info: Thông tin bổ sung về cuộc họp
+        
         Returns:
             Dictionary chứa summary và các thông tin đã trích xuất
         """
@@ -33,175 +335,293 @@ class LLMService:
             # Tạo prompt cho việc tóm tắt
             prompt = self._create_summary_prompt(transcript, meeting_info)
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Bạn là một AI chuyên gia về việc phân tích và tóm tắt cuộc họp. Hãy tạo biên bản cuộc họp chuyên nghiệp và chi tiết."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=2000,
-                temperature=0.3
-            )
-            
-            summary_text = response.choices[0].message.content
-            
-            # Phân tích và trích xuất thông tin từ summary
-            parsed_summary = self._parse_summary(summary_text)
+            summary_text, tokens_used = await self._chat(self._build_messages(prompt), **SUMMARY_PARAMS)
             
-            return {
-                "summary": summary_text,
-                "parsed_data": parsed_summary,
-                "model_used": self.model,
-                "tokens_used": response.usage.total_tokens if hasattr(response, 'usage') else 0
-            }
-            
-        except Exception as e:
+            return self._build_summary_result(summary_text, tokens_used)
+        
+        except openai.APIError as e:
+            # SDK đã retry các lỗi tạm thời (429, 5xx, timeout), đến đây là lỗi thật
             logger.error(f"Error generating meeting summary: {str(e)}")
             return None
     
-    def extract_action_items(self, transcript: str) -> Optional[List[Dict[str, Any]]]:
+    async def extract_action_items(self, transcript: str) -> Optional[List[Dict[str, Any]]]:
         """
         Trích xuất các nhiệm vụ cần làm từ transcript
         
         Args:
             transcript: Bản ghi cuộc họp
-            
+        
         Returns:
             List các action items
         """
         try:
-            prompt = f"""
-            Phân tích bản ghi cuộc họp sau và trích xuất tất cả các nhiệm vụ cần làm (action items).
+            prompt = self._create_prompt(transcript, ACTION_ITEMS_INSTRUCTIONS)
             
-            Với mỗi nhiệm vụ, hãy xác định:
-            1. Mô tả nhiệm vụ
-            2. Người chịu trách nhiệm (nếu có)
-            3. Deadline (nếu có)
-            4. Mức độ ưu tiên (cao/trung bình/thấp)
-            
-            Trả về kết quả dưới dạng JSON array với format:
-            [
-                {{
-                    "task": "Mô tả nhiệm vụ",
-                    "assignee": "Tên người chịu trách nhiệm",
-                    "deadline": "Ngày deadline",
-                    "priority": "cao/trung bình/thấp",
-                    "status": "pending"
-                }}
-            ]
-            
-            Bản ghi cuộc họp:
-            {transcript}
-            """
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=1000,
-                temperature=0.2
-            )
+            content, _ = await self._chat(self._build_messages(prompt), **ACTION_ITEMS_PARAMS)
             
-            # Parse JSON response
-            try:
-                action_items = json.loads(response.choices[0].message.content)
-                return action_items if isinstance(action_items, list) else []
-            except json.JSONDecodeError:
-                # Fallback: parse text response
-                return self._parse_action_items_from_text(response.choices[0].message.content)
-                
-        except Exception as e:
+            return self._parse_action_items(content)
+        
+        except openai.APIError as e:
             logger.error(f"Error extracting action items: {str(e)}")
             return []
     
-    def identify_participants(self, transcript: str) -> Optional[List[str]]:
+    async def identify_participants(self, transcript: str) -> Optional[List[str]]:
         """
         Xác định danh sách người tham gia cuộc họp
         
         Args:
             transcript: Bản ghi cuộc họp
-            
+        
         Returns:
             List tên người tham gia
         """
         try:
-            prompt = f"""
-            Phân tích bản ghi cuộc họp sau và xác định danh sách tất cả người tham gia.
-            
-            Trả về danh sách tên dưới dạng JSON array:
-            ["Tên người 1", "Tên người 2", ...]
+            # Dùng cùng bản ghi với các request khác để prefix giống nhau
+            # (bản ghi quá dài đã được _fit_transcript cắt cho vừa context window)
+            prompt = self._create_prompt(transcript, PARTICIPANTS_INSTRUCTIONS)
             
-            Chỉ trả về tên thật của người tham gia, không bao gồm "Speaker 1", "Speaker 2".
+            content, _ = await self._chat(self._build_messages(prompt), **PARTICIPANTS_PARAMS)
             
-            Bản ghi cuộc họp:
-            {transcript[:2000]}...
-            """
+            return self._parse_participants(content)
+        
+        except openai.APIError as e:
+            logger.error(f"Error identifying participants: {str(e)}")
+            return []
+    
+    async def submit_batch(self, jobs: List[Tuple[str, str, Optional[Dict]]]) -> Optional[str]:
+        """
+        Gửi phân tích của nhiều cuộc họp qua OpenAI Batch API (rẻ hơn 50%, kết quả trong 24h)
+        
+        Args:
+            jobs: Danh sách (job_id, transcript, meeting_info); job_id dùng để
+                ghép kết quả trong fetch_results
+        
+        Returns:
+            ID của batch hoặc None nếu không gửi được
+        """
+        if self.client is None or not jobs:
+            return None
+        
+        try:
+            lines = []
+            for job_id, transcript, meeting_info in jobs:
+                transcript = await asyncio.to_thread(self._fit_transcript, transcript, meeting_info)
+                for task, body in self._build_meeting_requests(transcript, meeting_info).items():
+                    lines.append(json.dumps({
+                        "custom_id": f"{job_id}:{task}",
+                        "method": "POST",
+                        "url": BATCH_ENDPOINT,
+                        "body": body
+                    }, ensure_ascii=False))
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=300,
-                temperature=0.2
+            input_file = await self.client.files.create(
+                file=("batch_input.jsonl", "\n".join(lines).encode('utf-8')),
+                purpose="batch"
+            )
+            batch = await self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint=BATCH_ENDPOINT,
+                completion_window=BATCH_COMPLETION_WINDOW
             )
             
-            try:
-                participants = json.loads(response.choices[0].message.content)
-                return participants if isinstance(participants, list) else []
-            except json.JSONDecodeError:
-                # Fallback: parse text response
-                return self._parse_participants_from_text(response.choices[0].message.content)
-                
+            logger.info(f"Submitted LLM batch {batch.id} with {len(lines)} requests")
+            return batch.id
+        
         except Exception as e:
-            logger.error(f"Error identifying participants: {str(e)}")
-            return []
+            logger.error(f"Error submitting LLM batch: {str(e)}")
+            return None
     
-    def _create_summary_prompt(self, transcript: str, meeting_info: Dict = None) -> str:
-        """Tạo prompt cho việc tóm tắt cuộc họp"""
-        base_prompt = f"""
-        Phân tích bản ghi cuộc họp sau và tạo biên bản cuộc họp chuyên nghiệp theo định dạng:
+    async def poll_batch(self, batch_id: str) -> Dict[str, Any]:
+        """
+        Lấy trạng thái của batch
         
-        BIÊN BẢN CUỘC HỌP
+        Returns:
+            Dictionary gồm status, done (đã kết thúc hay chưa), output_file_id
+        """
+        batch = await self.client.batches.retrieve(batch_id)
+        return {
+            "status": batch.status,
+            "done": batch.status in BATCH_FINAL_STATUSES,
+            "output_file_id": batch.output_file_id
+        }
+    
+    async def fetch_results(self, output_file_id: str) -> Dict[str, Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]], List[str]]]:
+        """
+        Tải kết quả của batch và parse giống như process_meeting
         
-        1. THÔNG TIN CHUNG:
-        - Thời gian: [Trích xuất từ nội dung hoặc thông tin bổ sung]
-        - Địa điểm: [Trích xuất từ nội dung]
-        - Người tham gia: [Danh sách người tham gia]
-        - Người ghi biên bản: [Nếu có]
+        Returns:
+            Dictionary job_id -> (summary, action_items, participants); phân tích
+            bị lỗi trong batch có giá trị None
+        """
+        output = await self.client.files.content(output_file_id)
         
-        2. MỤC ĐÍCH CUỘC HỌP:
-        - [Mục đích chính của cuộc họp]
+        contents = {}
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            
+            record = json.loads(line)
+            job_id, _, task = record["custom_id"].rpartition(":")
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code") != 200:
+                logger.error(f"LLM batch request {record['custom_id']} failed: {record.get('error') or response.get('status_code')}")
+                continue
+            
+            body = response["body"]
+            contents.setdefault(job_id, {})[task] = (
+                body["choices"][0]["message"]["content"],
+                (body.get("usage") or {}).get("total_tokens", 0)
+            )
         
-        3. NỘI DUNG THẢO LUẬN:
-        - [Các điểm thảo luận chính, được tổ chức theo chủ đề]
+        results = {}
+        for job_id, tasks in contents.items():
+            summary = None
+            if "summary" in tasks:
+                summary = self._build_summary_result(*tasks["summary"])
+            
+            action_items = self._parse_action_items(tasks["action_items"][0]) if "action_items" in tasks else None
+            participants = self._parse_participants(tasks["participants"][0]) if "participants" in tasks else None
+            results[job_id] = (summary, action_items, participants)
         
-        4. QUYẾT ĐỊNH:
-        - [Các quyết định quan trọng đã được đưa ra]
+        return results
+    
+    def _meeting_prompts(self, transcript: str, meeting_info: Dict = None) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """Prompt và tham số của 3 request phân tích một cuộc họp, theo tên task"""
+        return {
+            "summary": (self._create_summary_prompt(transcript, meeting_info), SUMMARY_PARAMS),
+            "action_items": (self._create_prompt(transcript, ACTION_ITEMS_INSTRUCTIONS), ACTION_ITEMS_PARAMS),
+            "participants": (self._create_prompt(transcript, PARTICIPANTS_INSTRUCTIONS), PARTICIPANTS_PARAMS)
+        }
+    
+    def _build_meeting_requests(self, transcript: str, meeting_info: Dict = None) -> Dict[str, Dict[str, Any]]:
+        """Body chat completion của 3 request phân tích một cuộc họp, theo tên task"""
+        return {
+            task: {
+                "model": self.model,
+                "messages": self._build_messages(prompt),
+                "max_tokens": params["max_tokens"],
+                "temperature": params["temperature"]
+            }
+            for task, (prompt, params) in self._meeting_prompts(transcript, meeting_info).items()
+        }
+    
+    def _get_encoding(self):
+        """Tokenizer của model (None nếu không load được), chỉ load một lần"""
+        with self._encoding_lock:
+            if self._encoding is None:
+                try:
+                    self._encoding = tiktoken.encoding_for_model(self.model)
+                except Exception as e:
+                    # Không tải được tokenizer: không kiểm tra được độ dài prompt
+                    logger.warning(f"Could not load tokenizer for {self.model}, prompt length will not be checked: {str(e)}")
+                    self._encoding = False
+        
+        return self._encoding or None
+    
+    def _fit_transcript(self, transcript: str, meeting_info: Dict = None) -> str:
+        """
+        Cắt bớt bản ghi để vừa context window của model
         
-        5. NHIỆM VỤ CẦN LÀM:
-        - [Danh sách công việc cụ thể với người chịu trách nhiệm và deadline]
+        Bản ghi chỉ được encode một lần cho cả ba request. Phần còn lại của
+        context window phải đủ cho phần hướng dẫn và câu trả lời (max_tokens)
+        của request lớn nhất. Bản ghi quá dài được giữ phần đầu (giới thiệu người
+        tham gia) và phần cuối (kết luận, phân công), bỏ phần giữa. Encode bản
+        ghi dài tốn CPU (lần đầu còn có thể tải file BPE), nên hàm này được chạy
+        ngoài event loop bằng asyncio.to_thread.
         
-        6. VẤN ĐỀ CẦN THEO DÕI:
-        - [Các vấn đề chưa giải quyết hoặc cần theo dõi]
+        Args:
+            transcript: Bản ghi cuộc họp
+            meeting_info: Thông tin bổ sung về cuộc họp
         
-        7. CUỘC HỌP TIẾP THEO:
-        - [Thông tin về cuộc họp tiếp theo nếu có]
+        Returns:
+            Bản ghi dùng cho prompt
         
-        Bản ghi cuộc họp:
-        {transcript}
+        Raises:
+            ValueError: Context window không đủ cho cả phần hướng dẫn
         """
+        encoding = self._get_encoding()
+        if encoding is None:
+            return transcript
+        
+        tokens = encoding.encode(transcript)
+        budget = self._transcript_token_budget(encoding, meeting_info)
+        if len(tokens) <= budget:
+            return transcript
         
+        budget -= len(encoding.encode(TRANSCRIPT_OMISSION_MARK))
+        if budget <= 0:
+            raise ValueError(f"Context window của model {self.model} không đủ cho prompt phân tích cuộc họp")
+        
+        logger.warning(f"Transcript has {len(tokens)} tokens, trimmed to {budget} tokens to fit {self.model}")
+        head = budget // 2
+        return "".join((
+            encoding.decode(tokens[:head]),
+            TRANSCRIPT_OMISSION_MARK,
+            encoding.decode(tokens[len(tokens) - (budget - head):])
+        ))
+    
+    def _transcript_token_budget(self, encoding, meeting_info: Dict = None) -> int:
+        """Số tokens tối đa của bản ghi để mọi request phân tích vừa context window"""
+        overhead = max(
+            len(encoding.encode(prompt)) + params["max_tokens"]
+            for prompt, params in self._meeting_prompts("", meeting_info).values()
+        )
+        context_tokens = MODEL_CONTEXT_TOKENS.get(self.model, DEFAULT_CONTEXT_TOKENS)
+        return context_tokens - len(encoding.encode(SYSTEM_PROMPT)) - PROMPT_TOKEN_MARGIN - overhead
+    
+    def _build_summary_result(self, summary_text: str, tokens_used: int) -> Dict[str, Any]:
+        """Tạo kết quả tóm tắt từ nội dung trả về của LLM"""
+        return {
+            "summary": summary_text,
+            # Phân tích và trích xuất thông tin từ summary
+            "parsed_data": self._parse_summary(summary_text),
+            "model_used": self.model,
+            "tokens_used": tokens_used
+        }
+    
+    def _parse_action_items(self, content: str) -> List[Dict[str, Any]]:
+        """Parse action items dạng JSON, fallback sang parse text"""
+        try:
+            action_items = json.loads(content)
+            return action_items if isinstance(action_items, list) else []
+        except json.JSONDecodeError:
+            # Fallback: parse text response
+            return self._parse_action_items_from_text(content)
+    
+    def _parse_participants(self, content: str) -> List[str]:
+        """Parse danh sách người tham gia dạng JSON, fallback sang parse text"""
+        try:
+            participants = json.loads(content)
+            return participants if isinstance(participants, list) else []
+        except json.JSONDecodeError:
+            # Fallback: parse text response
+            return self._parse_participants_from_text(content)
+    
+    def _build_messages(self, prompt: str) -> List[Dict[str, str]]:
+        """Tạo messages với system message dùng chung"""
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _create_prompt(self, transcript: str, instructions: str, *extra_parts: str) -> str:
+        """
+        Tạo prompt với bản ghi cuộc họp đặt trước, hướng dẫn đặt sau
+        
+        Các phần được nối bằng một lần str.join nên bản ghi (có thể rất dài)
+        chỉ được copy một lần vào prompt.
+        """
+        return "".join((TRANSCRIPT_HEADER, transcript, INSTRUCTIONS_HEADER, instructions, *extra_parts))
+    
+    def _create_summary_prompt(self, transcript: str, meeting_info: Dict = None) -> str:
+        """Tạo prompt cho việc tóm tắt cuộc họp"""
+        # Thông tin bổ sung đặt sau cùng để không làm thay đổi phần prefix
+        extra_parts = []
         if meeting_info:
-            additional_info = f"\n\nThông tin bổ sung về cuộc họp:\n"
-            for key, value in meeting_info.items():
-                additional_info += f"- {key}: {value}\n"
-            base_prompt += additional_info
+            extra_parts.append(MEETING_INFO_HEADER)
+            extra_parts.extend(f"- {key}: {value}\n" for key, value in meeting_info.items())
         
-        return base_prompt
+        return self._create_prompt(transcript, SUMMARY_INSTRUCTIONS, *extra_parts)
     
     def _parse_summary(self, summary_text: str) -> Dict[str, Any]:
         """Parse summary text để trích xuất thông tin cấu trúc"""
@@ -214,26 +634,16 @@ class LLMService:
         }
         
         try:
-            # Trích xuất thông tin chung
-            info_match = re.search(r'1\. THÔNG TIN CHUNG:(.*?)2\. MỤC ĐÍCH', summary_text, re.DOTALL)
-            if info_match:
-                info_text = info_match.group(1)
-                # Parse thời gian, địa điểm, người tham gia...
-                time_match = re.search(r'- Thời gian: (.*)', info_text)
-                if time_match:
-                    parsed["meeting_info"]["time"] = time_match.group(1).strip()
-                
-                location_match = re.search(r'- Địa điểm: (.*)', info_text)
-                if location_match:
-                    parsed["meeting_info"]["location"] = location_match.group(1).strip()
+            # Tách các mục theo header trong một lần quét
+            sections = split_summary(summary_text)
             
-            # Trích xuất các quyết định
-            decisions_match = re.search(r'4\. QUYẾT ĐỊNH:(.*?)5\. NHIỆM VỤ', summary_text, re.DOTALL)
-            if decisions_match:
-                decisions_text = decisions_match.group(1)
-                decisions = re.findall(r'- (.*)', decisions_text)
-                parsed["decisions"] = [d.strip() for d in decisions if d.strip()]
+            # Trích xuất thông tin chung (thời gian, địa điểm)
+            for field_match in _INFO_FIELD_RE.finditer(sections.get("THÔNG TIN CHUNG", "")):
+                parsed["meeting_info"].setdefault(_INFO_FIELDS[field_match.group(1)], field_match.group(2).strip())
             
+            # Trích xuất các quyết định
+            parsed["decisions"] = extract_items(sections.get("QUYẾT ĐỊNH"))
+        
         except Exception as e:
             logger.error(f"Error parsing summary: {str(e)}")
         
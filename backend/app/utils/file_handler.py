@@ -1,14 +1,56 @@
 # backend/app/utils/file_handler.py
 import os
+import secrets
 import shutil
-import hashlib
 import mimetypes
+import tempfile
+import time
+from functools import lru_cache
+from itertools import chain
+from blake3 import blake3
 from werkzeug.utils import secure_filename
 from typing import Optional, Dict, Any
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Kích thước buffer khi ghi file upload dạng stream
+UPLOAD_BUFFER_SIZE = 1 << 20
+
+# Kích thước chunk khi tính hash bằng cách đọc file (khi không mmap được)
+HASH_CHUNK_SIZE = 1 << 20
+
+@lru_cache(maxsize=32)
+def _mime_type_for_extension(extension: str) -> Optional[str]:
+    """MIME type theo extension (chỉ có vài extension được phép nên cache nhỏ là đủ)"""
+    return mimetypes.guess_type(f"file{extension}")[0]
+
+class _HashingFile:
+    """File object tính BLAKE3 hash của dữ liệu trong lúc ghi"""
+    
+    def __init__(self, raw):
+        self._raw = raw
+        self._hasher = blake3()
+    
+    def write(self, data):
+        self._hasher.update(data)
+        return self._raw.write(data)
+    
+    def hexdigest(self) -> str:
+        return self._hasher.hexdigest()
+    
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+    
+    def __iter__(self):
+        return iter(self._raw)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._raw.close()
+
 class FileHandler:
     def __init__(self, upload_folder: str, allowed_extensions: Dict[str, set]):
         """
@@ -19,7 +61,12 @@ class FileHandler:
             allowed_extensions: Dictionary các extension được phép
         """
         self.upload_folder = upload_folder
-        self.allowed_extensions = allowed_extensions
+        self.allowed_extensions = {
+            file_type: frozenset(extensions)
+            for file_type, extensions in allowed_extensions.items()
+        }
+        # Tập extension của tất cả các loại file, tính một lần
+        self._all_extensions = frozenset(chain.from_iterable(self.allowed_extensions.values()))
         os.makedirs(upload_folder, exist_ok=True)
     
     def is_allowed_file(self, filename: str, file_type: str = None) -> bool:
@@ -42,11 +89,7 @@ class FileHandler:
             return extension in self.allowed_extensions[file_type]
         
         # Kiểm tra tất cả các loại file
-        all_extensions = set()
-        for extensions in self.allowed_extensions.values():
-            all_extensions.update(extensions)
-        
-        return extension in all_extensions
+        return extension in self._all_extensions
     
     def save_uploaded_file(self, file, filename: str = None) -> Optional[Dict[str, Any]]:
         """
@@ -59,6 +102,7 @@ class FileHandler:
         Returns:
             Dictionary chứa thông tin file đã lưu hoặc None nếu lỗi
         """
+        file_path = None
         try:
             if not file or not file.filename:
                 logger.error("No file provided")
@@ -69,32 +113,15 @@ class FileHandler:
                 logger.error(f"File type not allowed: {file.filename}")
                 return None
             
-            # Tạo tên file an toàn
-            if not filename:
-                filename = secure_filename(file.filename)
-            else:
-                # Giữ extension gốc
-                original_ext = file.filename.rsplit('.', 1)[1].lower()
-                if '.' not in filename:
-                    filename = f"{filename}.{original_ext}"
-                filename = secure_filename(filename)
-            
-            # Tạo tên file unique nếu đã tồn tại
-            file_path = os.path.join(self.upload_folder, filename)
-            counter = 1
-            base_name, ext = os.path.splitext(filename)
-            
-            while os.path.exists(file_path):
-                new_filename = f"{base_name}_{counter}{ext}"
-                file_path = os.path.join(self.upload_folder, new_filename)
-                filename = new_filename
-                counter += 1
+            filename, file_path = self._resolve_upload_path(file.filename, filename)
             
-            # Lưu file
-            file.save(file_path)
+            # Lưu file, tính hash trên chính các chunk đang ghi (không đọc lại file)
+            with _HashingFile(open(file_path, 'wb')) as out:
+                shutil.copyfileobj(file.stream, out, UPLOAD_BUFFER_SIZE)
             
             # Lấy thông tin file
             file_info = self.get_file_info(file_path)
+            file_info['blake3_hash'] = out.hexdigest()
             file_info['filename'] = filename
             file_info['file_path'] = file_path
             
@@ -103,57 +130,165 @@ class FileHandler:
             
         except Exception as e:
             logger.error(f"Error saving file: {str(e)}")
+            if file_path:
+                self.delete_file(file_path)
+            return None
+    
+    def open_upload_stream(self, total_content_length=None, content_type=None,
+                           filename=None, content_length=None):
+        """
+        Stream factory cho werkzeug form parser: ghi phần file của request
+        thẳng vào một file tạm trong thư mục upload, tính hash trong lúc ghi
+        
+        Returns:
+            File object đã mở để ghi/đọc
+        """
+        return _HashingFile(tempfile.NamedTemporaryFile(
+            'wb+',
+            buffering=UPLOAD_BUFFER_SIZE,
+            dir=self.upload_folder,
+            prefix='.upload-',
+            suffix='.part',
+            delete=False
+        ))
+    
+    def save_streamed_file(self, file, filename: str = None) -> Optional[Dict[str, Any]]:
+        """
+        Lưu file upload đã được ghi xuống đĩa bởi open_upload_stream
+        
+        File tạm chỉ được đổi tên sang vị trí đích, không copy lại dữ liệu.
+        
+        Args:
+            file: FileStorage có stream được tạo bởi open_upload_stream
+            filename: Tên file tùy chỉnh (optional)
+            
+        Returns:
+            Dictionary chứa thông tin file đã lưu hoặc None nếu lỗi
+        """
+        file_path = None
+        try:
+            if not file or not file.filename:
+                logger.error("No file provided")
+                return None
+            
+            # Kiểm tra file được phép
+            if not self.is_allowed_file(file.filename):
+                logger.error(f"File type not allowed: {file.filename}")
+                return None
+            
+            filename, file_path = self._resolve_upload_path(file.filename, filename)
+            
+            # Đóng file tạm và đổi tên sang vị trí đích
+            file.stream.close()
+            os.replace(file.stream.name, file_path)
+            
+            # Lấy thông tin file, hash đã được tính khi nhận request
+            file_info = self.get_file_info(file_path)
+            file_info['blake3_hash'] = file.stream.hexdigest()
+            file_info['filename'] = filename
+            file_info['file_path'] = file_path
+            
+            logger.info(f"File saved successfully: {file_path}")
+            return file_info
+            
+        except Exception as e:
+            logger.error(f"Error saving streamed file: {str(e)}")
+            if file_path:
+                self.delete_file(file_path)
             return None
     
-    def get_file_info(self, file_path: str) -> Dict[str, Any]:
+    def _resolve_upload_path(self, original_filename: str, filename: str = None):
+        """
+        Tạo tên file an toàn, không trùng với file đã có trong thư mục upload
+        
+        File rỗng được tạo độc quyền (O_EXCL) tại đường dẫn trả về để giữ chỗ,
+        nên hai upload cùng tên chạy đồng thời không ghi đè lên nhau.
+        
+        Returns:
+            Tuple (tên file, đường dẫn file)
+        """
+        # Tạo tên file an toàn
+        if not filename:
+            filename = secure_filename(original_filename)
+        else:
+            # Giữ extension gốc
+            original_ext = original_filename.rsplit('.', 1)[1].lower()
+            if '.' not in filename:
+                filename = f"{filename}.{original_ext}"
+            filename = secure_filename(filename)
+        
+        base_name, ext = os.path.splitext(filename)
+        while True:
+            file_path = os.path.join(self.upload_folder, filename)
+            try:
+                with open(file_path, 'xb'):
+                    pass
+                return filename, file_path
+            except FileExistsError:
+                # Trùng tên: thêm hậu tố ngẫu nhiên thay vì thử lần lượt _1, _2...
+                filename = f"{base_name}_{secrets.token_hex(4)}{ext}"
+    
+    def get_file_info(self, file_path: str, include_hash: bool = False) -> Dict[str, Any]:
         """
         Lấy thông tin chi tiết của file
         
         Args:
             file_path: Đường dẫn file
+            include_hash: Tính BLAKE3 hash (phải đọc lại toàn bộ file)
             
         Returns:
             Dictionary chứa thông tin file
         """
         try:
-            if not os.path.exists(file_path):
+            # Một lần stat vừa kiểm tra file tồn tại vừa lấy metadata
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
                 return {}
             
-            stat = os.stat(file_path)
-            mime_type, _ = mimetypes.guess_type(file_path)
+            extension = os.path.splitext(file_path)[1].lower()
             
-            # Tính hash MD5
-            md5_hash = self.calculate_file_hash(file_path)
-            
-            return {
+            file_info = {
                 'size': stat.st_size,
-                'mime_type': mime_type,
+                'mime_type': _mime_type_for_extension(extension),
                 'created_time': stat.st_ctime,
                 'modified_time': stat.st_mtime,
-                'md5_hash': md5_hash,
-                'extension': os.path.splitext(file_path)[1].lower()
+                'extension': extension
             }
             
+            if include_hash:
+                file_info['blake3_hash'] = self.calculate_file_hash(file_path)
+            
+            return file_info
+            
         except Exception as e:
             logger.error(f"Error getting file info: {str(e)}")
             return {}
     
     def calculate_file_hash(self, file_path: str) -> Optional[str]:
         """
-        Tính MD5 hash của file
+        Tính BLAKE3 hash của file
+        
+        BLAKE3 dùng SIMD và nhiều luồng, file được đọc qua mmap nên không có
+        vòng lặp đọc chunk trong Python.
         
         Args:
             file_path: Đường dẫn file
             
         Returns:
-            MD5 hash string hoặc None nếu lỗi
+            BLAKE3 hash string (hex) hoặc None nếu lỗi
         """
         try:
-            hash_md5 = hashlib.md5()
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
+            hasher = blake3(max_threads=blake3.AUTO)
+            try:
+                hasher.update_mmap(file_path)
+            except OSError:
+                # Không mmap được (pipe, một số filesystem): đọc theo chunk lớn
+                hasher = blake3(max_threads=blake3.AUTO)
+                with open(file_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                        hasher.update(chunk)
+            return hasher.hexdigest()
         except Exception as e:
             logger.error(f"Error calculating file hash: {str(e)}")
             return None
@@ -209,17 +344,22 @@ class FileHandler:
             max_age_hours: Tuổi tối đa của file (giờ)
         """
         try:
-            import time
             current_time = time.time()
             max_age_seconds = max_age_hours * 3600
             
-            for filename in os.listdir(temp_folder):
-                file_path = os.path.join(temp_folder, filename)
-                if os.path.isfile(file_path):
-                    file_age = current_time - os.path.getctime(file_path)
-                    if file_age > max_age_seconds:
-                        self.delete_file(file_path)
-                        logger.info(f"Cleaned up old temp file: {file_path}")
+            # DirEntry dùng lại thông tin từ lần đọc thư mục, mỗi file chỉ cần một lần stat
+            with os.scandir(temp_folder) as entries:
+                for entry in entries:
+                    try:
+                        if not entry.is_file(follow_symlinks=False):
+                            continue
+                        
+                        if current_time - entry.stat(follow_symlinks=False).st_ctime > max_age_seconds:
+                            os.remove(entry.path)
+                            logger.info(f"Cleaned up old temp file: {entry.path}")
+                    except FileNotFoundError:
+                        # File đã bị xóa bởi tiến trình khác
+                        continue
                         
         except Exception as e:
             logger.error(f"Error during cleanup: {str(e)}")
@@ -0,0 +1,38 @@
+# backend/app/utils/summary_parser.py
+import re
+from typing import Dict, List
+
+# Header đánh số của các mục trong biên bản, ví dụ "4. QUYẾT ĐỊNH:"
+SECTION_HEADER_RE = re.compile(r'^[ \t]*\d+\.[ \t]+([A-ZÀ-Ỹ ]+?)[ \t]*:', re.MULTILINE)
+
+# Dòng gạch đầu dòng trong một mục
+ITEM_RE = re.compile(r'- (.*)')
+
+def split_summary(summary: str) -> Dict[str, str]:
+    """
+    Tách biên bản thành các mục theo header đánh số, chỉ quét text một lần
+    
+    Args:
+        summary: Biên bản do LLM tạo
+        
+    Returns:
+        Dictionary tên header (viết hoa) -> nội dung của mục (giữ mục đầu tiên
+        nếu header bị lặp)
+    """
+    sections = {}
+    if not summary:
+        return sections
+    
+    headers = list(SECTION_HEADER_RE.finditer(summary))
+    for i, header in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(summary)
+        sections.setdefault(header.group(1).strip(), summary[header.end():end])
+    
+    return sections
+
+def extract_items(section: str) -> List[str]:
+    """Lấy các gạch đầu dòng (không rỗng) của một mục"""
+    if not section:
+        return []
+    
+    return [item.strip() for item in ITEM_RE.findall(section) if item.strip()]
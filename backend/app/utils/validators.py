@@ -6,6 +6,17 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Ký tự không được phép trong tên file
+_INVALID_FILENAME_CHARS_RE = re.compile(r'[<>:"/\\|?*]')
+
+# Ký tự đặc biệt nguy hiểm bị loại khỏi input text
+_SANITIZE_RE = re.compile(r'[<>"\']')
+
+# Tên file reserved của Windows
+_RESERVED_NAMES = frozenset(
+    ['CON', 'PRN', 'AUX', 'NUL'] + [f'COM{i}' for i in range(1, 10)] + [f'LPT{i}' for i in range(1, 10)]
+)
+
 class Validators:
     
     @staticmethod
@@ -100,8 +111,7 @@ class Validators:
             return False
         
         # Kiểm tra ký tự không hợp lệ
-        invalid_chars = r'[<>:"/\\|?*]'
-        if re.search(invalid_chars, filename):
+        if _INVALID_FILENAME_CHARS_RE.search(filename):
             return False
         
         # Kiểm tra độ dài
@@ -109,9 +119,8 @@ class Validators:
             return False
         
         # Kiểm tra tên file reserved (Windows)
-        reserved_names = ['CON', 'PRN', 'AUX', 'NUL'] + [f'COM{i}' for i in range(1, 10)] + [f'LPT{i}' for i in range(1, 10)]
         name_without_ext = os.path.splitext(filename)[0].upper()
-        if name_without_ext in reserved_names:
+        if name_without_ext in _RESERVED_NAMES:
             return False
         
         return True
@@ -206,7 +215,7 @@ class Validators:
             return ""
         
         # Loại bỏ ký tự đặc biệt nguy hiểm
-        text = re.sub(r'[<>"\']', '', text)
+        text = _SANITIZE_RE.sub('', text)
         
         # Trim whitespace
         text = text.strip()
@@ -0,0 +1,40 @@
+# backend/batch_poller.py
+"""
+Cập nhật kết quả phân tích LLM gửi qua OpenAI Batch API (LLM_BATCH_MODE)
+
+Khi LLM_BATCH_MODE bật, sau bước transcription cuộc họp được gửi vào một
+OpenAI batch và giữ status 'processing'. Script này định kỳ kiểm tra các batch,
+lưu kết quả và tạo biên bản cho các cuộc họp có batch đã hoàn thành:
+    
+    LLM_BATCH_MODE=1 python batch_poller.py
+"""
+import logging
+import os
+import time
+
+from app import create_app
+from app.models import db
+from app.routes import meeting_routes
+
+logger = logging.getLogger(__name__)
+
+def main():
+    # Poller chỉ xử lý kết quả LLM, không cần Whisper model
+    app = create_app(os.environ.get('FLASK_ENV', 'production'), {'WHISPER_PRELOAD': False})
+    interval = app.config['LLM_BATCH_POLL_INTERVAL']
+    
+    with app.app_context():
+        while True:
+            try:
+                meeting_routes.poll_llm_batches()
+            except Exception as e:
+                # Lỗi của một lần poll (database, mạng...) không được dừng poller
+                logger.error("Error polling LLM batches: %s", e)
+            finally:
+                # Mỗi lần poll dùng session mới, không giữ object/transaction cũ
+                db.session.remove()
+            
+            time.sleep(interval)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+# backend/gunicorn.conf.py
+"""
+Cấu hình gunicorn cho production
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Mỗi worker tự load Whisper model sau khi fork. Với GPU, đặt WEB_CONCURRENCY=1
+(hoặc xử lý bằng worker.py khi có REDIS_URL) để chỉ một process giữ model trên GPU.
+"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND') or '0.0.0.0:5000'
+
+# Mỗi worker là một process với nhiều thread xử lý request
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY') or 2)
+threads = int(os.environ.get('GUNICORN_THREADS') or 4)
+
+# Không preload: thread của CTranslate2 và CUDA context tạo khi load Whisper
+# model không còn dùng được trong process con sau khi fork, nên mỗi worker phải
+# tự chạy create_app
+preload_app = False
+
+# Upload file lớn có thể mất nhiều thời gian
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 120)
+graceful_timeout = 30
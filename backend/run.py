@@ -7,7 +7,7 @@ config_name = os.environ.get('FLASK_ENV', 'development')
 app = create_app(config_name)
 
 if __name__ == '__main__':
-    # Development server
+    # Development server - không dùng cho production (xem wsgi.py)
     app.run(
         host='0.0.0.0',
         port=5000,
@@ -0,0 +1,6 @@
+# backend/tests/conftest.py
+import os
+import sys
+
+# Chạy pytest từ thư mục backend: import package app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,76 @@
+# backend/tests/test_models.py
+import os
+import sqlite3
+
+from flask import Flask
+
+from app.models import db, init_db
+from app.models.meeting import Meeting
+
+# Bảng meetings như phiên bản đầu tiên tạo ra (timestamp không có DEFAULT)
+OLD_MEETINGS_DDL = """
+CREATE TABLE meetings (
+    id INTEGER PRIMARY KEY,
+    title VARCHAR(200) NOT NULL,
+    filename VARCHAR(255) NOT NULL,
+    file_path VARCHAR(500) NOT NULL,
+    file_size INTEGER,
+    duration FLOAT,
+    transcript TEXT,
+    summary TEXT,
+    action_items TEXT,
+    participants TEXT,
+    status VARCHAR(50),
+    processing_progress INTEGER,
+    error_message TEXT,
+    created_at DATETIME,
+    updated_at DATETIME,
+    processed_at DATETIME,
+    document_path VARCHAR(500),
+    audio_path VARCHAR(500)
+)
+"""
+
+def _create_app(database_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + database_path
+    init_db(app)
+    return app
+
+def test_insert_into_table_created_by_old_schema(tmp_path):
+    database_path = os.path.join(str(tmp_path), 'meetings.db')
+    connection = sqlite3.connect(database_path)
+    connection.execute(OLD_MEETINGS_DDL)
+    connection.commit()
+    connection.close()
+    
+    app = _create_app(database_path)
+    
+    with app.app_context():
+        meeting = Meeting(title='Họp', filename='hop.mp3', file_path='/tmp/hop.mp3', status='uploaded')
+        db.session.add(meeting)
+        db.session.commit()
+        
+        meeting = db.session.get(Meeting, meeting.id)
+        assert meeting.created_at is not None
+        assert meeting.updated_at is not None
+        assert meeting.download_name is None
+        assert meeting.llm_batch_id is None
+        assert meeting.to_dict()['created_at'] is not None
+
+def test_update_refreshes_updated_at(tmp_path):
+    app = _create_app(os.path.join(str(tmp_path), 'meetings.db'))
+    
+    with app.app_context():
+        meeting = Meeting(title='Họp', filename='hop.mp3', file_path='/tmp/hop.mp3')
+        db.session.add(meeting)
+        db.session.commit()
+        
+        db.session.execute(db.text("UPDATE meetings SET updated_at = '2000-01-01 00:00:00'"))
+        db.session.commit()
+        
+        meeting = db.session.get(Meeting, meeting.id)
+        meeting.title = 'Họp mới'
+        db.session.commit()
+        
+        assert db.session.get(Meeting, meeting.id).updated_at.year > 2000
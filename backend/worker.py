@@ -0,0 +1,35 @@
+# backend/worker.py
+"""
+Worker xử lý cuộc họp (transcription + LLM), chạy tách khỏi web process
+
+Khi có REDIS_URL, web process chỉ đẩy job vào Redis queue; worker này load
+Whisper model một lần khi khởi động rồi lần lượt xử lý các job:
+
+    REDIS_URL=redis://localhost:6379/0 CUDA_VISIBLE_DEVICES=0 python worker.py
+
+Worker dùng SimpleWorker (chạy job ngay trong process, không fork mỗi job)
+để model đã load lên GPU được dùng lại giữa các job.
+"""
+import os
+import sys
+from rq import SimpleWorker
+
+from app import create_app
+from app.routes import meeting_routes
+
+def main():
+    app = create_app(os.environ.get('FLASK_ENV', 'production'))
+    
+    processing_queue = app.extensions.get('processing_queue')
+    if processing_queue is None:
+        sys.exit('REDIS_URL chưa được cấu hình')
+    
+    with app.app_context():
+        # Load Whisper model trước khi nhận job
+        meeting_routes.transcription_service.ensure_model_loaded()
+        
+        worker = SimpleWorker([processing_queue], connection=processing_queue.connection)
+        worker.work()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,14 @@
+# backend/wsgi.py
+"""
+WSGI entrypoint cho production
+
+Chạy với gunicorn (cấu hình trong gunicorn.conf.py):
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Không chạy với --preload: create_app load Whisper model, và model load trong
+master process không dùng được trong các worker sau khi fork.
+"""
+import os
+from app import create_app
+
+application = create_app(os.environ.get('FLASK_ENV', 'production'))